@@ -0,0 +1,242 @@
+# app/audit.py
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+# Policies for a full queue (the request path never waits unless the policy is "block")
+DROP_OLDEST = "drop_oldest"  # Keep the newest records, overwrite the oldest unwritten ones
+DROP_NEWEST = "drop_newest"  # Keep the oldest records, drop incoming ones
+BLOCK = "block"  # Backpressure: the request waits (up to block_timeout) for the writer
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+ACTIVE_SUFFIX = ".part"
+
+
+class AuditLogger:
+    """
+    Non-blocking, buffered audit log of every prediction.
+
+    The request path only appends a record to a bounded in-memory deque (append/popleft are
+    atomic, no lock is taken). A background writer thread drains the deque in batches and
+    appends them to gzip-compressed JSONL segment files, rotated by record count and age.
+    The segment being written ends in '.part' and is renamed when it is closed, so readers
+    (see app/audit_replay.py) only ever see complete segments.
+    """
+
+    def __init__(self,
+                 directory: Path,
+                 max_queue: int = 100_000,
+                 batch_size: int = 1_000,
+                 flush_interval: float = 1.0,
+                 segment_max_records: int = 100_000,
+                 segment_max_seconds: float = 3600.0,
+                 policy: str = DROP_OLDEST,
+                 block_timeout: float = 0.1):
+        """
+        :param directory: Folder for the segment files (created if needed)
+        :param max_queue: Maximum number of records held in memory
+        :param batch_size: Records written per batch (the writer also wakes up when this many are queued)
+        :param flush_interval: Maximum seconds between two flushes
+        :param segment_max_records: Rotate the segment after this many records
+        :param segment_max_seconds: Rotate the segment after this many seconds
+        :param policy: What to do when the queue is full (see POLICIES)
+        :param block_timeout: Maximum seconds a request waits under the "block" policy
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown audit queue policy '{policy}'. Choose one of {POLICIES}.")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_max_records = segment_max_records
+        self.segment_max_seconds = segment_max_seconds
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        # deque(maxlen=...) silently discards the oldest item when full: that is DROP_OLDEST
+        self._queue = deque(maxlen=max_queue if policy == DROP_OLDEST else None)
+        self._wakeup = threading.Event()
+        self._space = threading.Event()
+        self._closed = False
+
+        # Counters (approximate under heavy concurrency, they are not locked)
+        self.logged = 0  # Records accepted into the queue
+        self.dropped = 0  # Records rejected (drop_newest/block), evicted unwritten (drop_oldest) or lost to write errors
+        self.written = 0
+        self.write_errors = 0
+        self.last_error = None
+
+        self._segment = None
+        self._segment_path = None
+        self._segment_records = 0
+        self._segment_opened = 0.0
+        self._segment_index = 0
+
+        self._writer = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._writer.start()
+
+    # --- Request Path ---
+
+    def log(self, features: Dict, prediction, model_version: str, latency_ms: float, **extra) -> bool:
+        """
+        Queues one prediction record. Never does any I/O.
+
+        :param features: Raw input features (e.g. Passenger.model_dump())
+        :param prediction: Predicted class
+        :param model_version: Identifier of the model that made the prediction
+        :param latency_ms: Prediction latency in milliseconds
+        :param extra: Optional additional fields (e.g. survival_probability)
+        :return: True if the record was queued, False if it was dropped
+        """
+        if self._closed:
+            return False
+
+        record = {
+            "ts": time.time(),
+            "model_version": model_version,
+            "features": features,
+            "prediction": int(prediction),
+            "latency_ms": latency_ms,
+            **extra
+        }
+
+        if self.policy != DROP_OLDEST and len(self._queue) >= self.max_queue:
+            if self.policy == DROP_NEWEST or not self._wait_for_space():
+                self.dropped += 1
+                return False
+        elif self.policy == DROP_OLDEST and len(self._queue) == self.max_queue:
+            self.dropped += 1  # The append below evicts the oldest queued record
+
+        self._queue.append(record)
+        self.logged += 1
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _wait_for_space(self) -> bool:
+        """Backpressure for the "block" policy: waits until the writer has drained the queue."""
+        if not self._writer.is_alive():
+            return False  # Nobody will drain the queue; waiting would only add latency
+        deadline = time.perf_counter() + self.block_timeout
+        self._wakeup.set()
+        while True:
+            # Clear before checking: a drain that lands between the check and the wait still sets the event
+            self._space.clear()
+            if len(self._queue) < self.max_queue:
+                return True
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return False
+            self._space.wait(remaining)
+
+    # --- Background Writer ---
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            closed = self._closed
+            self._drain()
+            if closed:
+                break
+            if self._segment is not None and time.time() - self._segment_opened >= self.segment_max_seconds:
+                self._safely(self._close_segment)
+        self._safely(self._close_segment)
+
+    def _drain(self) -> None:
+        """Writes everything that is currently queued, batch by batch."""
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            self._space.set()
+            if not self._safely(self._write, batch):
+                self.dropped += len(batch)
+            elif self._segment_records >= self.segment_max_records:
+                self._safely(self._close_segment)
+
+    def _safely(self, action, *args) -> bool:
+        """
+        Runs one writer action. An error (e.g. disk full, failed rename, unserializable value) is
+        counted and the active segment is abandoned, but the writer thread keeps running.
+
+        :return: True if the action succeeded
+        """
+        try:
+            action(*args)
+            return True
+        except Exception as e:
+            self.write_errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"ERROR: Audit log write failed: {self.last_error}")
+            if self._segment is not None:
+                try:
+                    self._segment.close()
+                except Exception:
+                    pass
+                self._segment = None
+            return False
+
+    def _write(self, batch: List[Dict]) -> None:
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in batch)
+        if self._segment is None:
+            self._open_segment()
+        self._segment.write(lines.encode("utf-8"))
+        self._segment.flush()
+        self._segment_records += len(batch)
+        self.written += len(batch)
+
+    def _open_segment(self) -> None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self._segment_index += 1
+        name = f"audit-{stamp}-{os.getpid()}-{self._segment_index:05d}{SEGMENT_SUFFIX}{ACTIVE_SUFFIX}"
+        self._segment_path = self.directory / name
+        self._segment = gzip.open(self._segment_path, "wb")
+        self._segment_records = 0
+        self._segment_opened = time.time()
+
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        self._segment.close()
+        self._segment_path.rename(self._segment_path.with_name(self._segment_path.name[:-len(ACTIVE_SUFFIX)]))
+        self._segment = None
+
+    # --- Lifecycle ---
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Writes the remaining records, closes the active segment and stops the writer."""
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join(timeout)
+
+    def stats(self) -> Dict:
+        return {"logged": self.logged, "written": self.written, "dropped": self.dropped,
+                "queued": len(self._queue), "policy": self.policy, "writer_alive": self._writer.is_alive(),
+                "write_errors": self.write_errors, "last_error": self.last_error}
+
+
+# === Reading Segments ===
+
+def list_segments(directory: Path) -> List[Path]:
+    """Complete (closed) segment files in a folder, oldest first."""
+    return sorted(Path(directory).glob(f"*{SEGMENT_SUFFIX}"))
+
+
+def read_segments(paths: List[Path]) -> Iterator[Dict]:
+    """Yields the records of the given segment files in order."""
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
@@ -0,0 +1,138 @@
+# app/audit_replay.py
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.audit import list_segments, read_segments
+from src.data_processing import records_to_frame
+from src.config import AUDIT_LOG_DIR, MODEL_OUTPUT_PATH
+
+REPLAY_CHUNK_SIZE = 50_000
+
+# Logged fields that are not model inputs
+METADATA_COLUMNS = ["ts", "model_version", "endpoint", "prediction", "latency_ms"]
+
+
+def load_audit_records(paths: List[Path]) -> pd.DataFrame:
+    """
+    Loads audit segments into one DataFrame: the raw features plus the logged metadata.
+
+    :param paths: Segment files to read (see app.audit.list_segments)
+    :return: DataFrame with one row per logged prediction
+    """
+    records = list(read_segments(paths))
+    if not records:
+        return pd.DataFrame()
+
+    features = records_to_frame([record["features"] for record in records])
+    metadata = pd.DataFrame([{column: record.get(column) for column in METADATA_COLUMNS} for record in records])
+    print(f"{len(records)} audit records were loaded from {len(paths)} segments.")
+    return pd.concat([metadata, features], axis=1)
+
+
+def rescore(model, features: pd.DataFrame, chunk_size: int = REPLAY_CHUNK_SIZE) -> pd.Series:
+    """
+    Re-scores logged passengers in bulk (the API builds its inputs with the same
+    records_to_frame, so a passenger's prediction does not depend on how it is batched).
+
+    :param model: Fitted pipeline
+    :param features: Raw passenger features (API input columns)
+    :param chunk_size: Rows per model.predict call
+    :return: New predictions, aligned with 'features'
+    """
+    predictions = np.zeros(len(features), dtype=np.int64)
+    for start in range(0, len(features), chunk_size):
+        predictions[start:start + chunk_size] = model.predict(features.iloc[start:start + chunk_size])
+    return pd.Series(predictions, index=features.index)
+
+
+def compare(records: pd.DataFrame, new_predictions: pd.Series) -> Dict:
+    """
+    Summarizes how the new model's predictions differ from the logged ones.
+
+    :param records: Output of load_audit_records
+    :param new_predictions: Output of rescore
+    :return: Report dictionary (overall and per logged model version)
+    """
+    changed = records["prediction"] != new_predictions
+    report = {
+        "records": len(records),
+        "changed": int(changed.sum()),
+        "agreement": float(1 - changed.mean()) if len(records) else 1.0,
+        "flipped_to_survived": int(((records["prediction"] == 0) & (new_predictions == 1)).sum()),
+        "flipped_to_died": int(((records["prediction"] == 1) & (new_predictions == 0)).sum()),
+        "logged_survival_rate": float(records["prediction"].mean()) if len(records) else 0.0,
+        "new_survival_rate": float(new_predictions.mean()) if len(records) else 0.0,
+        "by_model_version": {}
+    }
+    for version, group in records.groupby("model_version"):
+        report["by_model_version"][version] = {
+            "records": len(group),
+            "agreement": float(1 - changed[group.index].mean())
+        }
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print("===== Audit Replay Report =====")
+    print(f"Records: {report['records']}  |  Changed: {report['changed']}  "
+          f"|  Agreement: {100 * report['agreement']:.2f}%")
+    print(f"Flipped 0 -> 1: {report['flipped_to_survived']}  |  Flipped 1 -> 0: {report['flipped_to_died']}")
+    print(f"Survival rate: logged {report['logged_survival_rate']:.3f}  ->  new {report['new_survival_rate']:.3f}")
+    for version, stats in report["by_model_version"].items():
+        print(f"  Logged model {version}: {stats['records']} records, "
+              f"{100 * stats['agreement']:.2f}% agreement")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Re-score logged predictions against a (new) model and compare the results."
+    )
+    parser.add_argument("--model", type=Path, default=MODEL_OUTPUT_PATH, help="Model (.joblib) to replay against.")
+    parser.add_argument("--audit-dir", type=Path, default=AUDIT_LOG_DIR, help="Folder with audit segments.")
+    parser.add_argument("--segments", type=Path, nargs="*", default=None,
+                        help="Specific segment files (default: every complete segment in --audit-dir).")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Optional CSV path for the records whose prediction changed.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    args = parse_args(argv)
+
+    try:
+        model = joblib.load(args.model)
+        print(f"The model was loaded from {args.model}.")
+    except FileNotFoundError:
+        print(f"ERROR: Model file not found at {args.model}.")
+        sys.exit(1)
+
+    paths = args.segments or list_segments(args.audit_dir)
+    records = load_audit_records(paths)
+    if records.empty:
+        print(f"ERROR: No audit records found in {args.audit_dir}.")
+        sys.exit(1)
+
+    features = records.drop(columns=METADATA_COLUMNS)
+    new_predictions = rescore(model, features)
+    report = compare(records, new_predictions)
+    print_report(report)
+
+    if args.output:
+        changed = records[records["prediction"] != new_predictions].assign(
+            new_prediction=new_predictions[records["prediction"] != new_predictions]
+        )
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        changed.to_csv(args.output, index=False)
+        print(f"Changed predictions saved to: {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+# app/loadtest.py
+
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+from src.config import PROJECT_ROOT
+
+# --- Load Test Defaults ---
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_ENDPOINT = "/predict"
+HEALTH_CHECK_PATH = "/"
+READINESS_TIMEOUT = 30.0
+READINESS_INTERVAL = 0.2
+
+# Open-loop requests sent this much later than scheduled count as late (the pool could not keep up)
+SCHEDULE_TOLERANCE = 0.01
+
+
+# === 1. Server Lifecycle ===
+
+def find_free_port(host: str = DEFAULT_HOST) -> int:
+    """
+    Asks the OS for a free TCP port on the given host.
+
+    :param host: Interface to bind the probe socket to
+    :return: A port number that was free at the time of the call
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(base_url: str,
+                     timeout: float = READINESS_TIMEOUT,
+                     interval: float = READINESS_INTERVAL,
+                     process: Optional[subprocess.Popen] = None) -> float:
+    """
+    Polls the health check endpoint until the API answers with 200 (instead of a fixed sleep).
+
+    :param base_url: Root URL of the API (e.g. http://127.0.0.1:8001)
+    :param timeout: Maximum number of seconds to wait
+    :param interval: Seconds between two polls
+    :param process: Optional server process; polling stops early if it exits
+    :return: Seconds it took for the API to become ready
+    """
+    start = time.perf_counter()
+    deadline = start + timeout
+    health_url = f"{base_url.rstrip('/')}{HEALTH_CHECK_PATH}"
+
+    while time.perf_counter() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"API process exited early with code {process.returncode}.")
+        try:
+            response = requests.get(health_url, timeout=interval * 5)
+            if response.status_code == 200:
+                return time.perf_counter() - start
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(interval)
+
+    raise TimeoutError(f"API at {base_url} was not ready after {timeout:.1f} seconds.")
+
+
+def start_uvicorn_subprocess(port: int, host: str = DEFAULT_HOST,
+                             audit_dir: Optional[Path] = None) -> subprocess.Popen:
+    """
+    Starts 'app.main:app' under a local uvicorn subprocess (the same command as the Dockerfile CMD).
+
+    The prediction audit log is disabled unless 'audit_dir' is given, so synthetic load never
+    ends up in the production audit folder (logs/audit/).
+
+    :param port: Port the server listens on
+    :param host: Interface the server binds to
+    :param audit_dir: Folder for the audit log of this server (None: audit log disabled)
+    :return: The running Popen handle (call stop_uvicorn_subprocess to terminate it)
+    """
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", host,
+        "--port", str(port),
+        "--log-level", "warning"
+    ]
+    env = {**os.environ, "TITANIC_AUDIT_LOG": "0"}
+    if audit_dir is not None:
+        env.update(TITANIC_AUDIT_LOG="1", TITANIC_AUDIT_DIR=str(audit_dir))
+    return subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+
+
+def stop_uvicorn_subprocess(process: subprocess.Popen, timeout: float = 10.0) -> None:
+    """
+    Terminates a uvicorn subprocess, killing it if it does not exit in time.
+
+    :param process: Handle returned by start_uvicorn_subprocess
+    :param timeout: Seconds to wait for a graceful shutdown
+    """
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def start_inprocess_server(port: int, host: str = DEFAULT_HOST, audit_dir: Optional[Path] = None):
+    """
+    Runs the FastAPI app with uvicorn on a background thread of the current process.
+
+    As with start_uvicorn_subprocess, the audit log is disabled unless 'audit_dir' is given.
+
+    :param port: Port the server listens on
+    :param host: Interface the server binds to
+    :param audit_dir: Folder for the audit log of this server (None: audit log disabled)
+    :return: (server, thread) tuple; set 'server.should_exit = True' and join the thread to stop it
+    """
+    import uvicorn
+    from app.main import app
+
+    # The config was read when app.main was imported, so override it on the app (see load_model)
+    app.state.audit_log_dir = audit_dir
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    return server, thread
+
+
+# === 2. Request Payloads ===
+
+def load_replay_file(path: Path) -> List[Dict]:
+    """
+    Loads passenger payloads from a JSONL replay file (one JSON object per line).
+
+    Prediction audit segments (app/audit.py, '.jsonl.gz') can be replayed directly:
+    gzip files are decompressed and only the 'features' of audit records are sent.
+
+    :param path: Path of the JSONL (or gzip-compressed JSONL) file
+    :return: List of passenger dictionaries
+    """
+    payloads = []
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{line_number} is not a JSON object.")
+            payloads.append(record["features"] if "features" in record else record)
+
+    if not payloads:
+        raise ValueError(f"Replay file {path} contains no payloads.")
+    print(f"{len(payloads)} payloads were loaded from {path}.")
+    return payloads
+
+
+def synthetic_passenger(rng: random.Random) -> Dict:
+    """
+    Generates a random, schema-valid passenger roughly following the Titanic marginals.
+
+    :param rng: Random generator (seeded by the caller for reproducibility)
+    :return: Passenger dictionary matching app.schema.Passenger
+    """
+    pclass = rng.choices([1, 2, 3], weights=[0.24, 0.21, 0.55])[0]
+    fare_scale = {1: 85.0, 2: 21.0, 3: 13.0}[pclass]
+    return {
+        "Pclass": pclass,
+        "Sex": rng.choices(["male", "female"], weights=[0.65, 0.35])[0],
+        "Age": None if rng.random() < 0.2 else round(rng.uniform(0.5, 80.0), 1),
+        "SibSp": rng.choices([0, 1, 2, 3, 4], weights=[0.68, 0.23, 0.03, 0.02, 0.04])[0],
+        "Parch": rng.choices([0, 1, 2, 3], weights=[0.76, 0.13, 0.09, 0.02])[0],
+        "Fare": round(rng.expovariate(1.0 / fare_scale), 2),
+        "Embarked": rng.choices(["S", "C", "Q", None], weights=[0.72, 0.19, 0.087, 0.003])[0]
+    }
+
+
+def iter_payloads(total: int,
+                  replay: Optional[List[Dict]] = None,
+                  batch_size: int = 1,
+                  seed: int = 0) -> Iterator:
+    """
+    Yields 'total' request bodies, cycling through the replay payloads or generating synthetic ones.
+
+    :param total: Number of request bodies to yield
+    :param replay: Optional list of passengers to replay in order
+    :param batch_size: If > 1, each body is a list of that many passengers (for batch endpoints)
+    :param seed: Seed for the synthetic passenger generator
+    """
+    rng = random.Random(seed)
+    index = 0
+
+    def next_passenger() -> Dict:
+        nonlocal index
+        if replay:
+            passenger = replay[index % len(replay)]
+            index += 1
+            return passenger
+        return synthetic_passenger(rng)
+
+    for _ in range(total):
+        if batch_size > 1:
+            yield [next_passenger() for _ in range(batch_size)]
+        else:
+            yield next_passenger()
+
+
+# === 3. Load Generation ===
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    :param sorted_values: Ascending list of values
+    :param q: Percentile in [0, 100]
+    :return: The percentile value (0.0 for an empty list)
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float],
+              status_counts: Dict[str, int],
+              errors: int,
+              wall_time: float,
+              passengers_per_request: int = 1,
+              schedule_lags: Optional[List[float]] = None) -> Dict:
+    """
+    Turns the raw measurements of a load test into a report.
+
+    :param latencies: Per-request latencies in seconds (successful and failed requests)
+    :param status_counts: Number of responses per HTTP status (or exception name)
+    :param errors: Number of failed requests (non-2xx or transport errors)
+    :param wall_time: Total duration of the test in seconds
+    :param passengers_per_request: Passengers scored per request (batch size)
+    :param schedule_lags: Open-loop only: seconds each request was sent after its scheduled time
+    :return: Report dictionary (latencies in milliseconds)
+    """
+    total = len(latencies)
+    ordered = sorted(latencies)
+    throughput = total / wall_time if wall_time > 0 else 0.0
+    report = {
+        "requests": total,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "wall_time_s": wall_time,
+        "throughput_rps": throughput,
+        "throughput_passengers_ps": throughput * passengers_per_request,
+        "latency_ms": {
+            "mean": 1000 * sum(ordered) / total if total else 0.0,
+            "p50": 1000 * percentile(ordered, 50),
+            "p95": 1000 * percentile(ordered, 95),
+            "p99": 1000 * percentile(ordered, 99),
+            "max": 1000 * ordered[-1] if ordered else 0.0
+        },
+        "status_counts": dict(status_counts)
+    }
+    if schedule_lags is not None:
+        lags = sorted(schedule_lags)
+        report["schedule_lag_ms"] = {
+            "p50": 1000 * percentile(lags, 50),
+            "p99": 1000 * percentile(lags, 99),
+            "max": 1000 * lags[-1] if lags else 0.0
+        }
+        report["late_requests"] = sum(1 for lag in lags if lag > SCHEDULE_TOLERANCE)
+    return report
+
+
+def run_load_test(base_url: str,
+                  payloads: List,
+                  endpoint: str = DEFAULT_ENDPOINT,
+                  concurrency: int = 8,
+                  rate: Optional[float] = None,
+                  timeout: float = 10.0) -> Dict:
+    """
+    Drives the API with the given request bodies and measures throughput, latency and errors.
+
+    Each worker thread reuses its own pooled requests.Session. Without 'rate' the test is
+    closed-loop (every worker sends as fast as it can); with 'rate' requests are scheduled
+    open-loop at that many requests per second. In open-loop mode latency is measured from the
+    scheduled send time, so requests that wait for a free worker (because the server slowed
+    down) count that wait instead of hiding it (coordinated omission). How late requests were
+    sent is reported as 'schedule_lag_ms' and 'late_requests'.
+
+    :param base_url: Root URL of the API
+    :param payloads: Request bodies to send (see iter_payloads)
+    :param endpoint: Path to POST to
+    :param concurrency: Number of concurrent workers
+    :param rate: Optional target request rate (requests/second)
+    :param timeout: Per-request timeout in seconds
+    :return: Report dictionary (see summarize)
+    """
+    url = f"{base_url.rstrip('/')}{endpoint}"
+    local = threading.local()
+    lock = threading.Lock()
+    latencies: List[float] = []
+    status_counts: Dict[str, int] = {}
+    schedule_lags: List[float] = []
+    errors = 0
+
+    def session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def send(index_and_body) -> None:
+        nonlocal errors
+        index, body = index_and_body
+        sent = time.perf_counter()
+        if rate:
+            scheduled = start + index / rate
+            if scheduled > sent:
+                time.sleep(scheduled - sent)
+                sent = time.perf_counter()
+        try:
+            response = session().post(url, json=body, timeout=timeout)
+            status = str(response.status_code)
+            failed = not response.ok
+        except requests.exceptions.RequestException as e:
+            status = type(e).__name__
+            failed = True
+        elapsed = time.perf_counter() - (scheduled if rate else sent)
+
+        with lock:
+            latencies.append(elapsed)
+            if rate:
+                schedule_lags.append(max(0.0, sent - scheduled))
+            status_counts[status] = status_counts.get(status, 0) + 1
+            if failed:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, enumerate(payloads)))
+    wall_time = time.perf_counter() - start
+
+    batch_size = len(payloads[0]) if payloads and isinstance(payloads[0], list) else 1
+    return summarize(latencies, status_counts, errors, wall_time, batch_size,
+                     schedule_lags if rate else None)
+
+
+def print_report(report: Dict) -> None:
+    """Prints a load test report in a human-readable form."""
+    latency = report["latency_ms"]
+    print("===== Load Test Report =====")
+    print(f"Requests: {report['requests']}  |  Errors: {report['errors']} "
+          f"({100 * report['error_rate']:.2f}%)")
+    print(f"Wall time: {report['wall_time_s']:.2f} s  |  "
+          f"Throughput: {report['throughput_rps']:.1f} req/s "
+          f"({report['throughput_passengers_ps']:.1f} passengers/s)")
+    print(f"Latency (ms): mean {latency['mean']:.2f}  p50 {latency['p50']:.2f}  "
+          f"p95 {latency['p95']:.2f}  p99 {latency['p99']:.2f}  max {latency['max']:.2f}")
+    print(f"Status counts: {report['status_counts']}")
+    if "schedule_lag_ms" in report:
+        lag = report["schedule_lag_ms"]
+        print(f"Schedule lag (ms): p50 {lag['p50']:.2f}  p99 {lag['p99']:.2f}  max {lag['max']:.2f}")
+        if report["late_requests"]:
+            print(f"WARNING: {report['late_requests']} requests were sent more than "
+                  f"{1000 * SCHEDULE_TOLERANCE:.0f} ms behind schedule; the target rate was not sustained "
+                  f"(raise --concurrency). Latencies include that wait.")
+
+
+# === 4. Command Line ===
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load-test the Titanic prediction API and report throughput and latency."
+    )
+    parser.add_argument("--mode", choices=["inprocess", "subprocess", "external"], default="subprocess",
+                        help="Run the API in this process, in a local uvicorn subprocess, "
+                             "or target an already running server (--url).")
+    parser.add_argument("--url", default=None, help="Root URL of a running API (external mode).")
+    parser.add_argument("--port", type=int, default=None, help="Port for local modes (default: a free port).")
+    parser.add_argument("--endpoint", default=DEFAULT_ENDPOINT, help="Endpoint to POST to.")
+    parser.add_argument("--replay", type=Path, default=None,
+                        help="JSONL file of passengers to replay (default: synthetic passengers).")
+    parser.add_argument("--requests", type=int, default=1000, help="Total number of requests.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent workers.")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Target request rate in req/s (default: as fast as possible).")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Passengers per request body; > 1 sends JSON lists (batch endpoints).")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured warm-up requests.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for synthetic passengers.")
+    parser.add_argument("--audit-dir", type=Path, default=None,
+                        help="Audit the load-test predictions to this folder (default: audit log disabled).")
+    parser.add_argument("--output", type=Path, default=None, help="Optional path to write the JSON report.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    args = parse_args(argv)
+
+    if args.mode == "external" and not args.url:
+        print("ERROR: --url is required in external mode.")
+        sys.exit(1)
+
+    replay = load_replay_file(args.replay) if args.replay else None
+    payloads = list(iter_payloads(args.requests, replay, args.batch_size, args.seed))
+    warmup = list(iter_payloads(args.warmup, replay, args.batch_size, args.seed + 1))
+
+    process = server = thread = None
+    port = args.port or find_free_port()
+    base_url = args.url or f"http://{DEFAULT_HOST}:{port}"
+
+    try:
+        if args.mode == "subprocess":
+            print(f"Starting local uvicorn subprocess on port {port}...")
+            process = start_uvicorn_subprocess(port, audit_dir=args.audit_dir)
+        elif args.mode == "inprocess":
+            print(f"Starting in-process uvicorn server on port {port}...")
+            server, thread = start_inprocess_server(port, audit_dir=args.audit_dir)
+
+        ready_after = wait_until_ready(base_url, process=process)
+        print(f"API is ready at {base_url} (after {ready_after:.2f} s).")
+
+        if warmup:
+            run_load_test(base_url, warmup, args.endpoint, args.concurrency)
+
+        print(f"Sending {len(payloads)} requests to {args.endpoint} "
+              f"(concurrency={args.concurrency}, rate={args.rate or 'max'})...")
+        report = run_load_test(base_url, payloads, args.endpoint, args.concurrency, args.rate)
+        report.update({"mode": args.mode, "endpoint": args.endpoint,
+                       "concurrency": args.concurrency, "target_rate": args.rate})
+    finally:
+        if process is not None:
+            stop_uvicorn_subprocess(process)
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    print_report(report)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Report saved to: {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,34 @@
 # app/main.py
 
+import hashlib
+import time
+
 import joblib
 import pandas as pd
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from app.audit import AuditLogger
 from app.schema import Passenger, PredictionResponse
 from typing import List
 
 # === Reward for the Work We Did in v1.0 and v2.0 ===
-from src.config import MODEL_OUTPUT_PATH, TEST_DATA_PATH
+from src.config import (
+    MODEL_OUTPUT_PATH,
+    TEST_DATA_PATH,
+    TRAIN_DATA_PATH,
+    USE_LOOKUP_PREDICTOR,
+    MAX_BATCH_SIZE,
+    AUDIT_LOG_ENABLED,
+    AUDIT_LOG_DIR,
+    AUDIT_QUEUE_POLICY,
+    AUDIT_MAX_QUEUE,
+    AUDIT_BLOCK_TIMEOUT,
+    AUDIT_BATCH_SIZE,
+    AUDIT_FLUSH_INTERVAL,
+    AUDIT_SEGMENT_MAX_RECORDS,
+    AUDIT_SEGMENT_MAX_SECONDS
+)
+from src.data_processing import load_data, split_features_target, records_to_frame
+from src.lookup_predictor import build_lookup_predictor
 
 # --- Installing the Application and Model ---
 app = FastAPI(
@@ -28,6 +49,47 @@ def load_model():
         print("Please make sure to run 'python -m src.train' before running the API.")
         app.state.model = None
 
+    # Short content hash of the model file: tells the audit log which model made each prediction
+    app.state.model_version = "unknown"
+    if app.state.model is not None:
+        app.state.model_version = hashlib.sha256(MODEL_OUTPUT_PATH.read_bytes()).hexdigest()[:12]
+
+    # The load-test harness sets 'audit_log_dir' on the app (None disables the log) to keep
+    # synthetic traffic out of the production audit folder
+    audit_log_dir = getattr(app.state, "audit_log_dir", AUDIT_LOG_DIR if AUDIT_LOG_ENABLED else None)
+    app.state.audit = None
+    if audit_log_dir is not None:
+        app.state.audit = AuditLogger(
+            audit_log_dir,
+            max_queue=AUDIT_MAX_QUEUE,
+            batch_size=AUDIT_BATCH_SIZE,
+            flush_interval=AUDIT_FLUSH_INTERVAL,
+            segment_max_records=AUDIT_SEGMENT_MAX_RECORDS,
+            segment_max_seconds=AUDIT_SEGMENT_MAX_SECONDS,
+            policy=AUDIT_QUEUE_POLICY,
+            block_timeout=AUDIT_BLOCK_TIMEOUT
+        )
+        print(f"Predictions are audited to {audit_log_dir} (policy: {AUDIT_QUEUE_POLICY}).")
+
+    app.state.lookup = None
+    if USE_LOOKUP_PREDICTOR and app.state.model is not None:
+        print("Building the lookup table predictor...")
+        data = load_data(TRAIN_DATA_PATH)
+        if data is not None:
+            X_reference, _ = split_features_target(data)
+            X_check = load_data(TEST_DATA_PATH)
+            if X_check is not None:
+                X_check = pd.concat([X_reference, X_check], ignore_index=True)
+            app.state.lookup = build_lookup_predictor(app.state.model, X_reference, X_check)
+
+
+@app.on_event("shutdown")
+def close_audit_log():
+    # Write the queued audit records and close the active segment
+    if app.state.audit is not None:
+        app.state.audit.close()
+        print(f"Audit log closed: {app.state.audit.stats()}")
+
 # --- API Endpoints ---
 
 @app.get("/", tags=["Health Check"])
@@ -47,11 +109,66 @@ def predict_survival(passenger: Passenger):
     if app.state.model is None:
         return {"error": "Model is not loaded."}
 
-    # 1. Convert Pydantic model to a DataFrame
-    input_data = pd.DataFrame([passenger.model_dump()])
+    features = passenger.model_dump()
+    start = time.perf_counter()
+
+    # 1. Constant-time table lookup (if enabled), no DataFrame needed
+    if app.state.lookup is not None:
+        prediction = app.state.lookup.predict_one(features)
+    else:
+        # 2. Otherwise, convert Pydantic model to a DataFrame and predict with the full pipeline
+        input_data = records_to_frame([features])
+        prediction = app.state.model.predict(input_data)[0]
+
+    # 3. Queue the audit record (no I/O on the request path)
+    if app.state.audit is not None:
+        latency_ms = (time.perf_counter() - start) * 1000
+        app.state.audit.log(features, prediction, app.state.model_version, latency_ms, endpoint="/predict")
+
+    # 4. Return the result in a format that matches the Pydantic response model
+    return {"Survived": prediction}
+
+
+@app.post("/predict_batch",
+          response_model=List[PredictionResponse],
+          tags=["Prediction"])
+def predict_survival_batch(passengers: List[Passenger]):
+    """
+    It estimates survival (class and probability) for a list of passengers in one request.
+
+    The whole batch goes through the pipeline as a single DataFrame, which is much cheaper than
+    one '/predict' round trip per passenger (used by the dashboard's bulk mode).
+    """
+    if app.state.model is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded.")
+    if len(passengers) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413,
+                            detail=f"Batch too large ({len(passengers)} > {MAX_BATCH_SIZE} passengers).")
+    if not passengers:
+        return []
+
+    # 1. Convert all Pydantic models to one DataFrame (missing values are handled exactly as in '/predict',
+    #    so a passenger's result does not depend on the rest of the batch)
+    features = [passenger.model_dump() for passenger in passengers]
+    start = time.perf_counter()
+    input_data = records_to_frame(features)
+
+    # 2. Predict probabilities once; the class is the most probable one (same as model.predict)
+    probabilities = app.state.model.predict_proba(input_data)
+    classes = app.state.model.classes_
+    survived_column = list(classes).index(1)
+    results = [
+        {"Survived": classes[row.argmax()], "SurvivalProbability": float(row[survived_column])}
+        for row in probabilities
+    ]
 
-    # 2. Predict
-    prediction = app.state.model.predict(input_data)[0]
+    # 3. Queue one audit record per passenger (the latency is the whole batch's)
+    if app.state.audit is not None:
+        latency_ms = (time.perf_counter() - start) * 1000
+        for passenger, result in zip(features, results):
+            app.state.audit.log(passenger, result["Survived"], app.state.model_version, latency_ms,
+                                endpoint="/predict_batch", survival_probability=result["SurvivalProbability"],
+                                batch_size=len(features))
 
-    # 3. Return the result in a format that matches the Pydantic response model
-    return {"Survived": prediction}
\ No newline at end of file
+    # 4. Return one response per passenger, in the input order
+    return results
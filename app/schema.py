@@ -17,4 +17,5 @@ class Passenger(BaseModel):
 # The response model that our API will send out
 class PredictionResponse(BaseModel):
     PassengerId: Optional[int] = None
-    Survived: int
\ No newline at end of file
+    Survived: int
+    SurvivalProbability: Optional[float] = Field(None, description="Predicted probability of survival (batch endpoint)")
\ No newline at end of file
@@ -1,14 +1,119 @@
 # dashboard/app.py
 
-import streamlit as st
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import altair as alt
+import pandas as pd
 import requests
-import json
+import streamlit as st
+from requests.adapters import HTTPAdapter
 
 # --- API and Model Information ---
 
 # The address where our v3.1 API runs (running on port 8000 in Docker)
 API_URL = "http://localhost:8000/predict"
 
+# Batch endpoint used by the bulk mode (one round trip per chunk instead of per passenger)
+BATCH_API_URL = "http://localhost:8000/predict_batch"
+
+# Bulk mode settings: passengers per request and number of concurrent requests
+CHUNK_SIZE = 250
+MAX_WORKERS = 4
+
+# Sweeps larger than this ask for confirmation before being sent
+MAX_SWEEP_SIZE = 20000
+
+# Progressive charts are redrawn at most this often (every redraw re-sends the chart data)
+REDRAW_INTERVAL = 0.5
+
+FEATURES = ["Pclass", "Sex", "Age", "SibSp", "Parch", "Fare", "Embarked"]
+REQUIRED_FEATURES = ["Pclass", "Sex", "SibSp", "Parch", "Fare"]
+
+
+# --- HTTP Client (shared, pooled) ---
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """One pooled HTTP session for the whole dashboard, so connections are reused across clicks."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def passenger_key(passenger: dict) -> tuple:
+    """Cache key of a passenger: its feature values in a fixed order."""
+    return tuple(passenger.get(feature) for feature in FEATURES)
+
+
+def post_chunk(session: requests.Session, chunk: list) -> list:
+    """Sends one chunk of passengers to the batch endpoint (runs in a worker thread)."""
+    response = session.post(BATCH_API_URL, json=chunk, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+
+def predict_bulk(passengers: list, on_progress=None) -> list:
+    """
+    Predicts many passengers through the batch endpoint.
+
+    Passengers already predicted in this session are served from the cache; the rest are
+    deduplicated, split into chunks and sent concurrently over the pooled session.
+
+    :param passengers: Passenger dictionaries (FEATURES keys)
+    :param on_progress: Optional callback(done, total, indices) called in this thread first for the
+                        cached passengers, then after every chunk; 'indices' are the input positions
+                        whose results just became known (so callers can keep a running list)
+    :return: One API result ({"Survived", "SurvivalProbability"}) per passenger, in input order
+    """
+    cache = st.session_state.setdefault("prediction_cache", {})
+
+    missing = {}  # key -> input positions waiting for that result
+    cached = []
+    for index, passenger in enumerate(passengers):
+        key = passenger_key(passenger)
+        if key in cache:
+            cached.append(index)
+        else:
+            missing.setdefault(key, []).append(index)
+    pending = [passengers[indices[0]] for indices in missing.values()]
+    chunks = [pending[i:i + CHUNK_SIZE] for i in range(0, len(pending), CHUNK_SIZE)]
+
+    done = len(cached)
+    if on_progress:
+        on_progress(done, len(passengers), cached)
+
+    session = get_session()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(post_chunk, session, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            indices = []
+            for passenger, result in zip(chunk, future.result()):
+                key = passenger_key(passenger)
+                cache[key] = result
+                indices.extend(missing[key])
+            done += len(indices)
+            if on_progress:
+                on_progress(done, len(passengers), indices)
+
+    return [cache[passenger_key(passenger)] for passenger in passengers]
+
+
+def show_api_error(error: Exception) -> None:
+    """Shows a helpful message for the most common API errors."""
+    if isinstance(error, requests.exceptions.ConnectionError):
+        st.error(
+            "Connection Error: Could not connect to the API. "
+            "Is the v3.1 Docker container running?"
+            "\nRun: `docker run -d --rm -p 8000:80 -v ${pwd}/models:/app/models titanic-api:v3`"
+        )
+    else:
+        st.error(f"An error occurred: {error}")
+
 
 # --- Streamlit Interface ---
 
@@ -25,60 +130,215 @@ st.write(
     "The model is running in a separate Docker container."
 )
 
-# --- User Input (Input Form) ---
-st.header("Enter Passenger Details:")
+mode = st.sidebar.radio("Mode", ["Single Passenger", "Bulk: CSV Upload", "Bulk: What-If Sweep"])
+if st.sidebar.button("Clear prediction cache"):
+    st.session_state["prediction_cache"] = {}
+st.sidebar.caption(f"Cached predictions: {len(st.session_state.get('prediction_cache', {}))}")
+
+
+# === 1. Single Passenger ===
+
+def single_passenger_mode() -> None:
+    # --- User Input (Input Form) ---
+    st.header("Enter Passenger Details:")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        p_class = st.selectbox("Passenger Class (Pclass)", [1, 2, 3])
+        sex = st.selectbox("Sex", ["male", "female"])
+        embarked = st.selectbox("Port of Embarkation (Embarked)", ["C", "Q", "S"])
 
-col1, col2 = st.columns(2)
+    with col2:
+        age = st.slider("Age", 0, 100, 25)
+        sib_sp = st.number_input("Siblings/Spouses (SibSp)", 0, 10, 0)
+        par_ch = st.number_input("Parents/Children (Parch)", 0, 10, 0)
 
-with col1:
-    p_class = st.selectbox("Passenger Class (Pclass)", [1, 2, 3])
-    sex = st.selectbox("Sex", ["male", "female"])
-    embarked = st.selectbox("Port of Embarkation (Embarked)", ["C", "Q", "S"])
+    fare = st.slider("Fare", 0.0, 600.0, 32.20)
 
-with col2:
-    age = st.slider("Age", 0, 100, 25)
-    sib_sp = st.number_input("Siblings/Spouses (SibSp)", 0, 10, 0)
-    par_ch = st.number_input("Parents/Children (Parch)", 0, 10, 0)
+    # --- Prediction Button and API Request ---
 
+    if st.button("🚢 Predict Survival"):
 
-fare = st.slider("Fare", 0.0, 600.0, 32.20)
+        # 1. Convert user input to the JSON format our API expects
+        passenger_data = {
+            "Pclass": p_class,
+            "Sex": sex,
+            "Age": age,
+            "SibSp": sib_sp,
+            "Parch": par_ch,
+            "Fare": fare,
+            "Embarked": embarked
+        }
 
-# --- Prediction Button and API Request ---
+        try:
+            # 2. Send a POST request to FastAPI (http://localhost:8000/predict) over the pooled session
+            response = get_session().post(API_URL, json=passenger_data)
+            response.raise_for_status()  # If there is an error (e.g. 500), throw an exception
 
-if st.button("🚢 Predict Survival"):
+            # 3. Retrieve JSON response from API
+            prediction = response.json()
+            survived = prediction.get("Survived")
 
-    # 1. Convert user input to the JSON format our API expects
-    passenger_data = {
-        "Pclass": p_class,
-        "Sex": sex,
-        "Age": age,
-        "SibSp": sib_sp,
-        "Parch": par_ch,
-        "Fare": fare,
-        "Embarked": embarked
-    }
+            # 4. Print the result beautifully on the screen
+            if survived == 1:
+                st.success("🎉 **This passenger would have SURVIVED!** 🎉")
+            else:
+                st.error("💔 **This passenger would NOT have survived.** 💔")
 
+        except Exception as e:
+            show_api_error(e)
+            st.json(passenger_data)  # Show what we sent on error
+
+
+# === 2. Bulk: CSV Upload ===
+
+def csv_chart(results: pd.DataFrame) -> alt.Chart:
+    """Predicted survival rate by Sex, one panel per Pclass."""
+    return alt.Chart(results).mark_bar().encode(
+        x=alt.X("Sex:N"),
+        y=alt.Y("mean(Survived):Q", title="Predicted survival rate"),
+        column=alt.Column("Pclass:O")
+    )
+
+
+def csv_upload_mode() -> None:
+    st.header("Upload Passengers (CSV):")
+    st.write(f"The CSV needs the columns {', '.join(FEATURES)} (extra columns such as "
+             "'PassengerId' or 'Name' are kept in the results). Kaggle's 'test.csv' works as is.")
+
+    uploaded = st.file_uploader("Passenger CSV", type="csv")
+    if uploaded is None:
+        return
+
+    # pandas' ParserError and EmptyDataError (and a file that is not UTF-8 text) are ValueErrors
     try:
-        # 2. Send a POST request to FastAPI (http://localhost:8000/predict)
-        response = requests.post(API_URL, json=passenger_data)
-        response.raise_for_status() # If there is an error (e.g. 500), throw an exception
+        data = pd.read_csv(uploaded)
+    except ValueError as e:
+        st.error(f"The file could not be read as CSV: {e}")
+        return
+    missing_columns = [feature for feature in FEATURES if feature not in data.columns]
+    if missing_columns:
+        st.error(f"Missing columns: {missing_columns}")
+        return
 
-        # 3. Retrieve JSON response from API
-        prediction = response.json()
-        survived = prediction.get("Survived")
+    # Rows without the features the API requires cannot be scored
+    valid = data[REQUIRED_FEATURES].notna().all(axis=1)
+    if not valid.all():
+        st.warning(f"{(~valid).sum()} rows with missing {REQUIRED_FEATURES} values are skipped.")
+    data = data[valid].reset_index(drop=True)
 
-        # 4. Print the result beautifully on the screen
-        if survived == 1:
-            st.success("🎉 **This passenger would have SURVIVED!** 🎉")
-        else:
-            st.error("💔 **This passenger would NOT have survived.** 💔")
+    features = data[FEATURES].astype(object).where(data[FEATURES].notna(), None)
+    try:
+        passengers = [
+            {**row, "Pclass": int(row["Pclass"]), "SibSp": int(row["SibSp"]),
+             "Parch": int(row["Parch"]), "Fare": float(row["Fare"])}
+            for row in features.to_dict("records")
+        ]
+    except (TypeError, ValueError) as e:
+        st.error(f"Pclass, SibSp, Parch and Fare must be numbers: {e}")
+        return
+    st.write(f"{len(passengers)} passengers loaded.")
 
-    except requests.exceptions.ConnectionError:
-        st.error(
-            "Connection Error: Could not connect to the API. "
-            "Is the v3.1 Docker container running?"
-            "\nRun: `docker run -d --rm -p 8000:80 -v ${pwd}/models:/app/models titanic-api:v3`"
-        )
+    if not st.button("🚢 Predict All"):
+        return
+
+    progress = st.progress(0.0)
+    chart = st.empty()
+    cache = st.session_state.setdefault("prediction_cache", {})
+    known = []  # Running list of scored rows, extended after every chunk
+    last_redraw = 0.0
+
+    def on_progress(done: int, total: int, indices: list) -> None:
+        nonlocal last_redraw
+        progress.progress(done / total if total else 1.0, text=f"{done} / {total} passengers")
+        known.extend({**passengers[i], **cache[passenger_key(passengers[i])]} for i in indices)
+        if known and (done == total or time.perf_counter() - last_redraw >= REDRAW_INTERVAL):
+            chart.altair_chart(csv_chart(pd.DataFrame(known)))
+            last_redraw = time.perf_counter()
+
+    try:
+        results = predict_bulk(passengers, on_progress)
     except Exception as e:
-        st.error(f"An error occurred: {e}")
-        st.json(passenger_data) # Show what we sent on error
\ No newline at end of file
+        show_api_error(e)
+        return
+
+    data["Survived"] = [result["Survived"] for result in results]
+    data["SurvivalProbability"] = [result["SurvivalProbability"] for result in results]
+
+    st.metric("Predicted survival rate", f"{data['Survived'].mean():.1%}")
+    st.dataframe(data)
+    st.download_button("Download predictions (CSV)", data.to_csv(index=False), "predictions.csv", "text/csv")
+
+
+# === 3. Bulk: What-If Sweep ===
+
+def sweep_heatmap(results: pd.DataFrame) -> alt.Chart:
+    """Survival probability over the Age x Fare grid, one panel per Pclass."""
+    return alt.Chart(results).mark_rect().encode(
+        x=alt.X("Age:O"),
+        y=alt.Y("Fare:O", sort="descending"),
+        color=alt.Color("SurvivalProbability:Q", scale=alt.Scale(domain=[0, 1], scheme="redblue")),
+        column=alt.Column("Pclass:O"),
+        tooltip=["Pclass", "Age", "Fare", "SurvivalProbability"]
+    )
+
+
+def sweep_mode() -> None:
+    st.header("What-If Sweep (Age × Fare per Pclass):")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        classes = st.multiselect("Passenger Classes (Pclass)", [1, 2, 3], default=[1, 2, 3])
+        sex = st.selectbox("Sex", ["male", "female"])
+        embarked = st.selectbox("Port of Embarkation (Embarked)", ["C", "Q", "S"])
+        sib_sp = st.number_input("Siblings/Spouses (SibSp)", 0, 10, 0)
+        par_ch = st.number_input("Parents/Children (Parch)", 0, 10, 0)
+    with col2:
+        age_range = st.slider("Age range", 0, 100, (0, 80))
+        age_step = st.number_input("Age step", 1, 20, 2)
+        fare_range = st.slider("Fare range", 0, 600, (0, 200))
+        fare_step = st.number_input("Fare step", 1, 100, 5)
+
+    ages = list(range(age_range[0], age_range[1] + 1, age_step))
+    fares = list(range(fare_range[0], fare_range[1] + 1, fare_step))
+    passengers = [
+        {"Pclass": p_class, "Sex": sex, "Age": float(age), "SibSp": sib_sp,
+         "Parch": par_ch, "Fare": float(fare), "Embarked": embarked}
+        for p_class, age, fare in itertools.product(classes, ages, fares)
+    ]
+    st.write(f"{len(passengers)} combinations "
+             f"({len(classes)} classes × {len(ages)} ages × {len(fares)} fares).")
+
+    confirmed = len(passengers) <= MAX_SWEEP_SIZE or st.checkbox(
+        f"Send more than {MAX_SWEEP_SIZE} combinations anyway")
+    if not passengers or not confirmed or not st.button("🚢 Run Sweep"):
+        return
+
+    progress = st.progress(0.0)
+    chart = st.empty()
+    cache = st.session_state.setdefault("prediction_cache", {})
+    known = []  # Running list of scored combinations, extended after every chunk
+    last_redraw = 0.0
+
+    def on_progress(done: int, total: int, indices: list) -> None:
+        # Redraw the heatmap with every combination that is already known
+        nonlocal last_redraw
+        progress.progress(done / total if total else 1.0, text=f"{done} / {total} combinations")
+        known.extend({**passengers[i], **cache[passenger_key(passengers[i])]} for i in indices)
+        if known and (done == total or time.perf_counter() - last_redraw >= REDRAW_INTERVAL):
+            chart.altair_chart(sweep_heatmap(pd.DataFrame(known)))
+            last_redraw = time.perf_counter()
+
+    try:
+        predict_bulk(passengers, on_progress)
+    except Exception as e:
+        show_api_error(e)
+
+
+if mode == "Single Passenger":
+    single_passenger_mode()
+elif mode == "Bulk: CSV Upload":
+    csv_upload_mode()
+else:
+    sweep_mode()
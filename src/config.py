@@ -1,5 +1,6 @@
 # src/config.py
 
+import os
 from pathlib import Path
 
 # === 1. File Paths ===
@@ -42,4 +43,37 @@ RANDOM_STATE = 42
 # === 5. MLFlow Experiment Tracking Settings ===
 
 # Tells MLFlow what name to save our experiment with
-MLFLOW_EXPERIMENT_NAME = "Titanic Survival Prediction"
\ No newline at end of file
+MLFLOW_EXPERIMENT_NAME = "Titanic Survival Prediction"
+
+# === 6. API Serving Settings ===
+
+# Serve '/predict' from a precomputed lookup table (src/lookup_predictor.py) instead of the full pipeline.
+# The table is built at startup from the training data, so 'data/raw/train.csv' must be available.
+USE_LOOKUP_PREDICTOR = os.environ.get("TITANIC_LOOKUP_PREDICTOR", "0") == "1"
+
+# Maximum number of passengers accepted by a single '/predict_batch' request
+MAX_BATCH_SIZE = 1000
+
+# === 7. Prediction Audit Log Settings ===
+
+# Every prediction is queued in memory and written in batches to rotating, gzip-compressed
+# JSONL segments by a background thread (app/audit.py). Set TITANIC_AUDIT_LOG=0 to disable.
+AUDIT_LOG_ENABLED = os.environ.get("TITANIC_AUDIT_LOG", "1") == "1"
+AUDIT_LOG_DIR = Path(os.environ.get("TITANIC_AUDIT_DIR", PROJECT_ROOT / "logs" / "audit"))
+
+# Full-queue policy: "block" (wait up to AUDIT_BLOCK_TIMEOUT, then drop), "drop_newest" or "drop_oldest"
+AUDIT_QUEUE_POLICY = os.environ.get("TITANIC_AUDIT_POLICY", "block")
+AUDIT_MAX_QUEUE = 100_000
+AUDIT_BLOCK_TIMEOUT = 0.1
+AUDIT_BATCH_SIZE = 1_000
+AUDIT_FLUSH_INTERVAL = 1.0
+AUDIT_SEGMENT_MAX_RECORDS = 100_000
+AUDIT_SEGMENT_MAX_SECONDS = 3600
+
+# === 8. Profiling Settings ===
+
+# Stage traces of training/prediction runs (src/profiling.py) are written here
+PROFILE_OUTPUT_DIR = PROJECT_ROOT / "reports" / "profiles"
+
+# Capture a cProfile profile of the pipeline fit (set TITANIC_PROFILE_FIT=1 or pass --profile-fit)
+PROFILE_FIT = os.environ.get("TITANIC_PROFILE_FIT", "0") == "1"
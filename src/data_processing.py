@@ -1,5 +1,6 @@
 # src/data_processing.py
 
+import numpy as np
 import pandas as pd
 
 from src.config import TRAIN_DATA_PATH, TARGET_VARIABLE
@@ -41,4 +42,19 @@ def split_features_target(data: pd.DataFrame, target: str = TARGET_VARIABLE) ->
     X = data.drop(target, axis=1)
     y = data[target]
     print("The data was separated into features (X) and target (y).")
-    return X, y
\ No newline at end of file
+    return X, y
+
+
+def records_to_frame(records: list) -> pd.DataFrame:
+    """
+    Builds the pipeline input DataFrame from raw passenger dictionaries (e.g. API requests).
+
+    Missing values (None) always become NaN, so the pipeline imputes them no matter what else is
+    in the batch. Left to pandas, a column that mixes None and strings turns None into NaN (imputed),
+    while an all-None column stays 'object' and the encoder treats None as an unknown category.
+
+    :param records: Passenger dictionaries (e.g. Passenger.model_dump())
+    :return: pandas DataFrame with NaN for every missing value
+    """
+    frame = pd.DataFrame(records)
+    return frame.astype(object).where(frame.notna(), np.nan).infer_objects()
@@ -0,0 +1,414 @@
+# src/lookup_predictor.py
+
+import threading
+import time
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from src.data_processing import records_to_frame
+
+# Upper bound on the number of grid cells (one bit each, so 64 MB) we are willing to precompute
+DEFAULT_MAX_CELLS = 512_000_000
+
+# Cells whose summed vote margin is this close to 0 (per tree) are re-scored exactly by the forest
+TIE_TOLERANCE = 1e-9
+
+# Number of rows scored per forest call while re-scoring near-tie cells
+RESCORE_CHUNK_SIZE = 100_000
+
+
+class LookupTablePredictor:
+    """
+    A drop-in replacement for the trained pipeline that answers from a precomputed table.
+
+    Apart from Age and Fare, every passenger feature is small and discrete, and even Age and
+    Fare only matter through the split thresholds the forest actually uses. The numerical
+    features are binned to those thresholds (every threshold interval, so any value has a
+    bin) and the categorical features to their known categories. Inference is then an index
+    computation plus one bit lookup.
+
+    The table is stored as one bit-packed Age x Fare slice per combination of the other
+    features. Slices for the combinations in a reference dataset (normally the training data)
+    are built at load time, any other combination on its first request (a few milliseconds).
+
+    Missing values are imputed exactly like the pipeline does (see records_to_frame). Only an
+    unknown category (which the encoder ignores) falls back to the full pipeline.
+    """
+
+    def __init__(self, pipeline: Pipeline, X_reference: pd.DataFrame, max_cells: int = DEFAULT_MAX_CELLS):
+        """
+        Builds the lookup table for a fitted pipeline (see src/pipeline.py).
+
+        :param pipeline: Fitted 'preprocessor' + 'classifier' (binary RandomForest) Pipeline
+        :param X_reference: Raw passengers whose slices are built up front (e.g. the training features)
+        :param max_cells: Refuse to build grids larger than this many cells
+        """
+        start = time.perf_counter()
+        self.pipeline = pipeline
+        self.preprocessor = pipeline.named_steps["preprocessor"]
+        self.forest = pipeline.named_steps["classifier"]
+        self.classes_ = self.forest.classes_
+        if len(self.classes_) != 2:
+            raise ValueError("LookupTablePredictor only supports binary classifiers.")
+
+        self._numeric = {}  # feature -> (fill value, mean, scale, sorted thresholds)
+        self._level_index = {}  # categorical feature -> {category: level}
+        self._categorical_fill = {}  # categorical feature -> imputed category
+
+        # The two numerical axes with the most bins (Age and Fare) form the slices; the other
+        # axes select a slice. Each tree leaf covers a rectangle of every slice it reaches.
+        numeric_axes = sorted(self._numeric_axes(), key=lambda axis: len(axis[3]))
+        categorical_axes = self._categorical_axes()
+        axes = categorical_axes + numeric_axes
+
+        self._axes = [(feature, kind) for feature, kind, _, _ in axes]
+        self._columns = [columns for _, _, columns, _ in axes]
+        self._level_values = [values for _, _, _, values in axes]
+        self._n_outer = len(axes) - 2
+
+        self.shape = tuple(len(values) for values in self._level_values)
+        self.n_cells = int(np.prod(self.shape))
+        if self.n_cells > max_cells:
+            raise ValueError(f"Lookup grid has {self.n_cells} cells {self.shape} (limit: {max_cells}).")
+        self._plane_shape = self.shape[self._n_outer:]
+
+        self._column_axis = np.full(self.forest.n_features_in_, -1)
+        self._column_local = np.full(self.forest.n_features_in_, -1)
+        for axis, columns in enumerate(self._columns):
+            self._column_axis[columns] = axis
+            self._column_local[columns] = np.arange(len(columns))
+
+        self._collect_leaves()
+        self._slices = {}  # tuple of outer levels -> bit-packed Age x Fare slice
+        self._build_lock = threading.Lock()
+        keys, _ = self._keys_and_offsets(X_reference)
+        for key in np.unique(keys[(keys >= 0).all(axis=1)], axis=0):
+            self._slice(tuple(key.tolist()))
+
+        # Counters (approximate under heavy concurrency, they are not locked)
+        self.table_hits = 0
+        self.fallbacks = 0
+        self.build_seconds = time.perf_counter() - start
+        print(f"Lookup grid with {self.n_cells} cells "
+              f"{dict(zip([feature for feature, _ in self._axes], self.shape))}: "
+              f"{len(self._slices)} of {self.n_cells // int(np.prod(self._plane_shape))} slices "
+              f"were built in {self.build_seconds:.2f} s (the others are built on first use).")
+
+    # --- Grid Construction ---
+
+    def _transformer(self, name: str):
+        """Returns the fitted sub-pipeline, input columns and output offset of a ColumnTransformer step."""
+        for step_name, transformer, columns in self.preprocessor.transformers_:
+            if step_name == name:
+                return transformer, list(columns), self.preprocessor.output_indices_[name].start
+        raise ValueError(f"Preprocessor has no '{name}' step.")
+
+    def _numeric_axes(self) -> list:
+        """
+        One axis per numerical feature, with one level per threshold interval. Each level is
+        represented by the largest float32 value inside its interval.
+        """
+        transformer, features, offset = self._transformer("num")
+        imputer = transformer.named_steps["imputer"]
+        scaler = transformer.named_steps["scaler"]
+
+        axes = []
+        for i, feature in enumerate(features):
+            column = offset + i
+            thresholds = self._float32_thresholds(np.concatenate([
+                tree.tree_.threshold[tree.tree_.feature == column]
+                for tree in self.forest.estimators_
+            ]))
+            fill = float(imputer.statistics_[i])
+            mean = float(scaler.mean_[i]) if scaler.mean_ is not None else 0.0
+            scale = float(scaler.scale_[i]) if scaler.scale_ is not None else 1.0
+
+            # Interval k is (t[k-1], t[k]]: its largest value is t[k] itself; the last one is unbounded
+            last = np.float32(thresholds[-1] if len(thresholds) else 0.0)
+            values = np.append(thresholds, np.nextafter(last, np.float32(np.inf))).astype(np.float32)
+
+            self._numeric[feature] = (fill, mean, scale, thresholds.tolist())
+            axes.append((feature, "numeric", [column], values.reshape(-1, 1)))
+        return axes
+
+    @staticmethod
+    def _float32_thresholds(thresholds: np.ndarray) -> np.ndarray:
+        """
+        Replaces every threshold by the largest float32 value not above it and deduplicates.
+
+        The trees compare float32 inputs, so 'x <= t' and 'x <= floor32(t)' always agree; this
+        also merges thresholds that are closer than one float32 step.
+        """
+        floored = thresholds.astype(np.float32)
+        above = floored > thresholds
+        floored[above] = np.nextafter(floored[above], np.float32(-np.inf))
+        return np.unique(floored).astype(np.float64)
+
+    def _categorical_axes(self) -> list:
+        """
+        One axis per categorical feature, with one level per known category. Missing values are
+        imputed to one of them. Each level is encoded by running a single-row DataFrame through
+        the real preprocessor, exactly like the API does.
+        """
+        transformer, features, offset = self._transformer("cat")
+        imputer = transformer.named_steps["imputer"]
+        encoder = transformer.named_steps["onehot"]
+
+        # A valid template row; the categorical level under test is substituted into it
+        template = {feature: spec[0] for feature, spec in self._numeric.items()}
+        template.update({feature: categories[0] for feature, categories in zip(features, encoder.categories_)})
+
+        axes = []
+        for i, (feature, categories) in enumerate(zip(features, encoder.categories_)):
+            start = offset + sum(len(c) for c in encoder.categories_[:i])
+            columns = list(range(start, start + len(categories)))
+
+            levels, values = {}, []
+            self._categorical_fill[feature] = imputer.statistics_[i]
+            for category in (c for c in categories if not pd.isna(c)):
+                row = records_to_frame([{**template, feature: category}])
+                try:
+                    encoded = self.preprocessor.transform(row)
+                except Exception:
+                    continue  # The pipeline cannot score this level; leave it to the fallback
+                levels[category] = len(values)
+                values.append(np.asarray(encoded, dtype=np.float32)[0, columns])
+
+            self._level_index[feature] = levels
+            axes.append((feature, "categorical", columns, np.array(values, dtype=np.float32)))
+        return axes
+
+    def _rows(self, levels: list) -> np.ndarray:
+        """Transformed (float32) feature rows for grid levels given as one index array per axis."""
+        rows = np.zeros((len(levels[0]), self.forest.n_features_in_), dtype=np.float32)
+        for axis, level in enumerate(levels):
+            rows[:, self._columns[axis]] = self._level_values[axis][level]
+        return rows
+
+    def _collect_leaves(self) -> None:
+        """
+        Walks every tree and stores, for each leaf reachable from inside the grid, a level mask per
+        outer axis, its [start, stop) bins on both slice axes and its vote margin
+        P(classes_[1]) - P(classes_[0]).
+        """
+        masks, bounds, margins = [], [], []
+        for tree in self.forest.estimators_:
+            structure = tree.tree_
+            full = ([np.ones(n, dtype=bool) for n in self.shape[:self._n_outer]],
+                    [(0, n) for n in self._plane_shape])
+            stack = [(0,) + full]
+            leaves = []
+
+            while stack:
+                node, leaf_masks, leaf_bounds = stack.pop()
+                if structure.children_left[node] == -1:
+                    leaves.append((leaf_masks, leaf_bounds))
+                    continue
+
+                column = structure.feature[node]
+                axis = self._column_axis[column]
+                goes_left = self._level_values[axis][:, self._column_local[column]] <= structure.threshold[node]
+                left, right = structure.children_left[node], structure.children_right[node]
+                if axis < self._n_outer:
+                    for child, side in ((left, goes_left), (right, ~goes_left)):
+                        child_mask = leaf_masks[axis] & side
+                        if child_mask.any():
+                            child_masks = list(leaf_masks)
+                            child_masks[axis] = child_mask
+                            stack.append((child, child_masks, leaf_bounds))
+                else:
+                    # Level values are sorted, so the split is a cut between two bins
+                    plane_axis, cut = axis - self._n_outer, int(goes_left.sum())
+                    lo, hi = leaf_bounds[plane_axis]
+                    for child, child_bounds in ((left, (lo, min(hi, cut))), (right, (max(lo, cut), hi))):
+                        if child_bounds[0] < child_bounds[1]:
+                            bounds_ = list(leaf_bounds)
+                            bounds_[plane_axis] = child_bounds
+                            stack.append((child, leaf_masks, bounds_))
+
+            # Score one representative row per leaf with the tree itself, so the probabilities
+            # are exactly the ones RandomForestClassifier.predict_proba accumulates
+            levels = [np.array([np.argmax(leaf_masks[axis]) for leaf_masks, _ in leaves])
+                      for axis in range(self._n_outer)]
+            levels += [np.array([leaf_bounds[axis][0] for _, leaf_bounds in leaves])
+                       for axis in range(len(self._plane_shape))]
+            probabilities = tree.predict_proba(self._rows(levels))
+            masks.extend(leaf_masks for leaf_masks, _ in leaves)
+            bounds.extend(leaf_bounds for _, leaf_bounds in leaves)
+            margins.append(probabilities[:, 1] - probabilities[:, 0])
+
+        self._leaf_masks = [np.array([leaf_masks[axis] for leaf_masks in masks]) for axis in range(self._n_outer)]
+        self._leaf_bounds = np.array(bounds).reshape(len(bounds), 4)  # Age start/stop, Fare start/stop
+        self._leaf_margins = np.concatenate(margins)
+
+    def _slice(self, key: tuple) -> np.ndarray:
+        """Returns the bit-packed slice of an outer level combination, building it on first use."""
+        packed = self._slices.get(key)
+        if packed is None:
+            with self._build_lock:
+                packed = self._slices.get(key)
+                if packed is None:
+                    packed = self._slices[key] = self._build_slice(key)
+        return packed
+
+    def _build_slice(self, key: tuple) -> np.ndarray:
+        """
+        Sums the vote margins of the leaves reaching this combination over its Age x Fare slice
+        and stores the winning class per cell as one bit. Each leaf adds its margin to a rectangle,
+        so the margins are accumulated as 2-D differences and summed with two cumsums. Near-ties
+        are re-scored with the forest itself, which reproduces predict_proba's own rounding and
+        argmax tie-breaking.
+        """
+        reaches = np.ones(len(self._leaf_margins), dtype=bool)
+        for axis, level in enumerate(key):
+            reaches &= self._leaf_masks[axis][:, level]
+        a_start, a_stop, f_start, f_stop = self._leaf_bounds[reaches].T
+        margin = self._leaf_margins[reaches]
+
+        n_age, n_fare = self._plane_shape
+        corners = np.concatenate([a_start * (n_fare + 1) + f_start, a_start * (n_fare + 1) + f_stop,
+                                  a_stop * (n_fare + 1) + f_start, a_stop * (n_fare + 1) + f_stop])
+        weights = np.concatenate([margin, -margin, -margin, margin])
+        differences = np.bincount(corners, weights, minlength=(n_age + 1) * (n_fare + 1))
+        margins = differences.reshape(n_age + 1, n_fare + 1).cumsum(axis=0).cumsum(axis=1)[:n_age, :n_fare].ravel()
+
+        cells = (margins > 0).astype(np.uint8)
+        ties = np.flatnonzero(np.abs(margins) <= TIE_TOLERANCE * len(self.forest.estimators_))
+        for chunk in range(0, len(ties), RESCORE_CHUNK_SIZE):
+            tied = ties[chunk:chunk + RESCORE_CHUNK_SIZE]
+            levels = [np.full(len(tied), level) for level in key] + list(np.unravel_index(tied, self._plane_shape))
+            cells[tied] = np.argmax(self.forest.predict_proba(self._rows(levels)), axis=1)
+        return np.packbits(cells)
+
+    # --- Inference ---
+
+    def _locate(self, passenger: dict) -> tuple:
+        """
+        Bins a single passenger.
+
+        :return: (tuple of outer levels, or None for an unknown category, which the encoder ignores;
+                 cell index inside the Age x Fare slice)
+        """
+        key, offset = [], 0
+        for feature, kind in self._axes:
+            value = passenger.get(feature)
+            if kind == "numeric":
+                fill, mean, scale, thresholds = self._numeric[feature]
+                if value is None or value != value:
+                    value = fill
+                level = bisect_left(thresholds, float(np.float32((value - mean) / scale)))
+            else:
+                if value is None or value != value:
+                    value = self._categorical_fill[feature]
+                level = self._level_index[feature].get(value, -1)
+                if level < 0:
+                    return None, -1
+            if len(key) < self._n_outer:
+                key.append(level)
+            else:
+                offset = offset * (len(thresholds) + 1) + level
+        return tuple(key), offset
+
+    def _keys_and_offsets(self, X: pd.DataFrame) -> tuple:
+        """
+        Vectorized _locate.
+
+        :return: (array of outer levels per passenger, -1 for unknown categories; array of slice cell indices)
+        """
+        levels = []
+        for feature, kind in self._axes:
+            if kind == "numeric":
+                fill, mean, scale, thresholds = self._numeric[feature]
+                values = pd.to_numeric(X[feature]).astype(float).fillna(fill).to_numpy()
+                scaled = ((values - mean) / scale).astype(np.float32).astype(np.float64)
+                levels.append(np.searchsorted(thresholds, scaled, side="left"))
+            else:
+                lookup = self._level_index[feature]
+                values = X[feature].astype(object).where(X[feature].notna(), self._categorical_fill[feature])
+                levels.append(values.map(lambda v: lookup.get(v, -1)).to_numpy(dtype=np.int64))
+
+        keys = np.stack(levels[:self._n_outer], axis=1).reshape(len(X), self._n_outer)
+        return keys, np.ravel_multi_index(levels[self._n_outer:], self._plane_shape)
+
+    def predict_one(self, passenger: dict):
+        """
+        Predicts a single passenger given as a dictionary (e.g. Passenger.model_dump()).
+
+        :param passenger: Raw passenger features
+        :return: Predicted class (for an unknown category: the full pipeline's prediction)
+        """
+        key, offset = self._locate(passenger)
+        if key is None:
+            self.fallbacks += 1
+            return self.pipeline.predict(records_to_frame([passenger]))[0]
+
+        self.table_hits += 1
+        packed = self._slice(key)
+        return self.classes_[(packed[offset >> 3] >> (7 - (offset & 7))) & 1]
+
+    def stats(self) -> dict:
+        """Single-passenger counters: table hits and full pipeline calls, plus the number of built slices."""
+        total = self.table_hits + self.fallbacks
+        return {"table_hits": self.table_hits, "fallbacks": self.fallbacks, "slices": len(self._slices),
+                "table_hit_rate": self.table_hits / total if total else 1.0}
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        Vectorized prediction with the same interface as Pipeline.predict.
+
+        :param X: Raw passenger features
+        :return: Array of predicted classes
+        """
+        keys, offsets = self._keys_and_offsets(X)
+        in_grid = (keys >= 0).all(axis=1)
+        bits = np.zeros(len(X), dtype=np.uint8)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        for i, key in enumerate(unique_keys):
+            if (key >= 0).all():
+                rows = np.flatnonzero(inverse.ravel() == i)
+                packed = self._slice(tuple(key.tolist()))
+                bits[rows] = (packed[offsets[rows] >> 3] >> (7 - (offsets[rows] & 7))) & 1
+
+        predictions = self.classes_[bits]
+        if not in_grid.all():
+            predictions[~in_grid] = self.pipeline.predict(X[~in_grid])
+        return predictions
+
+    def check_parity(self, X: pd.DataFrame) -> int:
+        """
+        Compares the table against the full pipeline on the given passengers.
+
+        :param X: Raw passenger features
+        :return: Number of passengers on which the two disagree
+        """
+        mismatches = int((self.predict(X) != self.pipeline.predict(X)).sum())
+        print(f"Lookup table parity check: {mismatches} mismatches out of {len(X)} passengers.")
+        return mismatches
+
+
+def build_lookup_predictor(pipeline: Pipeline,
+                           X_reference: pd.DataFrame,
+                           X_check: pd.DataFrame = None,
+                           max_cells: int = DEFAULT_MAX_CELLS):
+    """
+    Builds a LookupTablePredictor and only returns it if it agrees with the pipeline.
+
+    :param pipeline: Fitted pipeline to accelerate
+    :param X_reference: Raw passengers whose slices are built up front
+    :param X_check: Passengers for the parity check (default: X_reference)
+    :param max_cells: Refuse to build grids larger than this many cells
+    :return: LookupTablePredictor, or None if it could not be built or disagrees with the pipeline
+    """
+    try:
+        predictor = LookupTablePredictor(pipeline, X_reference, max_cells)
+    except Exception as e:
+        print(f"ERROR: Lookup table could not be built: {e}")
+        return None
+
+    if predictor.check_parity(X_reference if X_check is None else X_check) > 0:
+        print("ERROR: Lookup table disagrees with the pipeline. Using the full pipeline instead.")
+        return None
+    return predictor
@@ -0,0 +1,216 @@
+# src/profiling.py
+
+import cProfile
+import datetime
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    # Unix only: the process' peak resident set size. On Windows the memory columns are left empty.
+    import resource
+except ImportError:
+    resource = None
+
+# ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+_MAXRSS_TO_MB = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    :return: Peak resident memory of this process so far, in MB (None if it cannot be measured)
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_TO_MB
+
+
+class StageTracer:
+    """
+    Lightweight timing trace of the stages of one run (training or prediction).
+
+    Each 'with tracer.stage(name):' block records its wall time, CPU time (all threads of the
+    process, so a multi-threaded fit can show more CPU than wall time) and how much it raised the
+    process' peak resident memory. Stages can be nested; nested names are joined with a dot
+    (e.g. 'fit.classifier'). Measuring costs three system calls per stage.
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: Name of the traced run (e.g. 'train'), used in the trace file name
+        """
+        self.name = name
+        self.stages: List[Dict] = []
+        self._stack: List[str] = []
+        self._origin = time.perf_counter()
+        self._started = datetime.datetime.now()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Times the enclosed block as one stage. The stage is recorded even if the block raises
+        (or calls sys.exit), with status 'error'.
+
+        :param name: Stage name (short, metric-friendly, e.g. 'load_data')
+        """
+        self._stack.append(name)
+        full_name = ".".join(self._stack)
+        status = "error"
+        rss_before = peak_rss_mb()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            yield
+            status = "ok"
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            rss_after = peak_rss_mb()
+            self._stack.pop()
+            self.stages.append({
+                "stage": full_name,
+                "depth": len(self._stack),
+                "start_s": wall_start - self._origin,
+                "wall_s": wall,
+                "cpu_s": cpu,
+                "peak_rss_delta_mb": None if rss_before is None else rss_after - rss_before,
+                "peak_rss_mb": rss_after,
+                "status": status
+            })
+
+    def summary(self) -> List[Dict]:
+        """
+        :return: Recorded stages in start order
+        """
+        return sorted(self.stages, key=lambda stage: stage["start_s"])
+
+    def print_summary(self) -> None:
+        """Prints a table of the stages, with each top-level stage's share of the total wall time."""
+        total = sum(stage["wall_s"] for stage in self.stages if stage["depth"] == 0) or 1.0
+        print(f"===== Stage Profile ({self.name}) =====")
+        print(f"{'Stage':<28}{'Wall (s)':>10}{'CPU (s)':>10}{'Peak RSS +MB':>14}{'Share':>8}")
+        for stage in self.summary():
+            name = "  " * stage["depth"] + stage["stage"].split(".")[-1]
+            rss = "-" if stage["peak_rss_delta_mb"] is None else f"{stage['peak_rss_delta_mb']:.1f}"
+            share = f"{100 * stage['wall_s'] / total:.1f}%" if stage["depth"] == 0 else ""
+            print(f"{name:<28}{stage['wall_s']:>10.3f}{stage['cpu_s']:>10.3f}{rss:>14}{share:>8}")
+
+    def log_to_mlflow(self) -> None:
+        """Logs every stage as MLflow metrics ('stage.<name>.wall_s', '.cpu_s', '.peak_rss_delta_mb')."""
+        import mlflow
+
+        metrics = {}
+        for stage in self.stages:
+            for key in ("wall_s", "cpu_s", "peak_rss_delta_mb"):
+                if stage[key] is not None:
+                    metrics[f"stage.{stage['stage']}.{key}"] = stage[key]
+        mlflow.log_metrics(metrics)
+
+    def to_chrome_trace(self) -> Dict:
+        """
+        :return: The stages in Chrome Trace Event format (open in https://ui.perfetto.dev or chrome://tracing)
+        """
+        events = [
+            {
+                "name": stage["stage"].split(".")[-1],
+                "cat": self.name,
+                "ph": "X",
+                "ts": stage["start_s"] * 1e6,
+                "dur": stage["wall_s"] * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+                "args": {key: stage[key] for key in ("stage", "cpu_s", "peak_rss_delta_mb", "peak_rss_mb", "status")}
+            }
+            for stage in self.summary()
+        ]
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"run": self.name, "started": self._started.isoformat(timespec="seconds")}
+        }
+
+    def write(self, directory: Path) -> Path:
+        """
+        Writes the trace as a JSON file.
+
+        :param directory: Output folder (created if needed)
+        :return: Path of the trace file
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.name}_{self._started.strftime('%Y-%m-%d_%H-%M-%S')}.trace.json"
+        path.write_text(json.dumps(self.to_chrome_trace(), indent=2), encoding="utf-8")
+        print(f"Stage trace saved to: {path}")
+        return path
+
+
+def save_trace(tracer: StageTracer, directory: Path, log_to_mlflow: bool = False, extra_artifacts: tuple = ()):
+    """
+    Prints the stage table and saves the trace; optionally logs both to the active MLFlow run.
+
+    Meant for a 'finally' block, so it never raises: a run that failed (or called sys.exit) still
+    leaves its trace behind, including the stage that failed (status 'error').
+
+    :param tracer: The run's tracer
+    :param directory: Output folder for the trace file
+    :param log_to_mlflow: Also log the stage metrics and the trace (plus extra_artifacts) to MLFlow
+    :param extra_artifacts: Additional files to log under 'profiling/' if they exist (e.g. the fit profile)
+    :return: Path of the trace file, or None if it could not be saved
+    """
+    try:
+        tracer.print_summary()
+        trace_path = tracer.write(directory)
+    except Exception as e:
+        print(f"ERROR: Stage trace could not be saved: {e}")
+        return None
+
+    if log_to_mlflow:
+        try:
+            import mlflow
+
+            tracer.log_to_mlflow()
+            for path in (trace_path, *extra_artifacts):
+                if Path(path).exists():
+                    mlflow.log_artifact(str(path), artifact_path="profiling")
+        except Exception as e:
+            print(f"ERROR: Stage trace could not be logged to MLFlow: {e}")
+    return trace_path
+
+
+@contextmanager
+def optional_cprofile(enabled: bool, output_path: Path, top: int = 20):
+    """
+    Runs the enclosed block under cProfile when enabled (otherwise does nothing).
+
+    The raw profile is saved to 'output_path' (inspect it with 'python -m pstats' or snakeviz) and
+    the 'top' functions by cumulative time are printed. cProfile only sees the calling thread, so
+    work done in joblib worker threads/processes (n_jobs) shows up as waiting time.
+
+    :param enabled: Whether to profile
+    :param output_path: Where to save the .prof file
+    :param top: Number of functions to print
+    """
+    if not enabled:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(output_path)
+
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(top)
+        print(report.getvalue())
+        print(f"Profile saved to: {output_path}")
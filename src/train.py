@@ -1,5 +1,6 @@
 # src/train.py
 
+import argparse
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from joblib import dump
@@ -7,6 +8,7 @@ import sys
 import mlflow
 import mlflow.sklearn
 import datetime
+from typing import List, Optional
 
 # Let's import functions and settings from our other .py files
 from src.config import (
@@ -15,93 +17,137 @@ from src.config import (
     RANDOM_STATE,
     MLFLOW_EXPERIMENT_NAME,
     NUMERICAL_FEATURES,
-    CATEGORICAL_FEATURES
+    CATEGORICAL_FEATURES,
+    PROFILE_OUTPUT_DIR,
+    PROFILE_FIT
 )
 from src.data_processing import load_data, split_features_target
 from src.pipeline import create_pipeline
+from src.profiling import StageTracer, optional_cprofile, save_trace
 
 
-def run_training():
+def run_training(profile_fit: bool = PROFILE_FIT):
     """
     Manages the main training process.
 
-    Records parameters, metrics, and the model with MLFlow.
+    Records parameters, metrics, and the model with MLFlow. Every stage is timed (wall time, CPU time,
+    peak memory); the stage metrics are logged to MLFlow and the trace is saved to PROFILE_OUTPUT_DIR.
+
+    :param profile_fit: Also capture a cProfile profile of the pipeline fit
     """
     print("===== Starting the Training Process (v2.0 - with MLFlow) =====")
-
-    # === Start the MLFlow Experiment ===
-    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+    tracer = StageTracer("train")
 
     current_time = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     run_name = f"run_{current_time}"
+    profile_path = PROFILE_OUTPUT_DIR / f"train_{current_time}_fit.prof"
 
-    with mlflow.start_run(run_name=run_name):
-
-        mlflow.set_tag("description", "Standard RandomForest training run.")
-        mlflow.set_tag("run_name", run_name)
-
-        # 1. Load Data
-        data = load_data()
-        if data is None:
-            print("ERROR: Failed to load data. Stopping training.")
-            sys.exit(1)
-
-        # 2. Separate into Features (X) and Target (y)
-        X, y = split_features_target(data)
-        if X is None or y is None:
-            print("ERROR: Data could not be separated into X and y. Stopping training.")
-            sys.exit(1)
-
-        # 3. Split into Training and Test Sets
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y,
-            test_size=TEST_SIZE,
-            random_state=RANDOM_STATE
-        )
-        print(f"Data was split into training and test sets. (Test size: {TEST_SIZE})")
-
-        # --- MLFlow Registration Step 1: Parameters ---
-        print("Saving parameters to MLFlow...")
-        mlflow.log_param("test_size", TEST_SIZE)
-        mlflow.log_param("random_state", RANDOM_STATE)
-        mlflow.log_param("numerical_features_count", len(NUMERICAL_FEATURES))
-        mlflow.log_param("categorical_features_count", len(CATEGORICAL_FEATURES))
-
-        # 4. Create the Pipeline
-        pipeline = create_pipeline()
-
-        # 5. TRAIN Pipeline
-        print("Pipeline training (fit) begins...")
-        pipeline.fit(X_train, y_train)
-        print("Pipeline training has been completed.")
-
-        # 6. Evaluate Pipeline
-        accuracy = pipeline.score(X_test, y_test)
-        print(f"The accuracy score of the model on the test data: {accuracy:.4f}")
-
-        # --- MLFlow Recording Step 2: Metrics ---
-        print("Saving metrics to MLFlow...")
-        mlflow.log_metric("accuracy", accuracy)
-
-        # 7. Save Trained Pipeline (Locally)
-        print(f"The trained model (pipeline) is saved to: {MODEL_OUTPUT_PATH}")
-
-        # Make sure the 'models/' folder exists before saving
-        MODEL_OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-        dump(pipeline, MODEL_OUTPUT_PATH)
-        print("The model has been successfully saved.")
-
-        # --- MLFlow Registration Step 3: Model (Artifact) ---
-        print("Saving model (artifact) to MLFlow...")
-        mlflow.sklearn.log_model(
-            sk_model=pipeline,
-            artifact_path="model",
-            input_example=X_train.head()
-        )
-
-        print("===== Training Process Completed (MLFlow) =====")
+    # === Start the MLFlow Experiment ===
+    try:
+        with tracer.stage("set_experiment"):
+            mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+        with tracer.stage("start_run"):
+            active_run = mlflow.start_run(run_name=run_name)
+    except BaseException:
+        # No MLFlow run to log to (e.g. the tracking server is down): keep the local trace only
+        save_trace(tracer, PROFILE_OUTPUT_DIR)
+        raise
+
+    with active_run:
+
+        # The stage profile is saved even if a stage fails or the run stops early (sys.exit)
+        try:
+            mlflow.set_tag("description", "Standard RandomForest training run.")
+            mlflow.set_tag("run_name", run_name)
+
+            # 1. Load Data
+            with tracer.stage("load_data"):
+                data = load_data()
+            if data is None:
+                print("ERROR: Failed to load data. Stopping training.")
+                sys.exit(1)
+
+            # 2. Separate into Features (X) and Target (y)
+            with tracer.stage("split_features_target"):
+                X, y = split_features_target(data)
+            if X is None or y is None:
+                print("ERROR: Data could not be separated into X and y. Stopping training.")
+                sys.exit(1)
+
+            # 3. Split into Training and Test Sets
+            with tracer.stage("train_test_split"):
+                X_train, X_test, y_train, y_test = train_test_split(
+                    X, y,
+                    test_size=TEST_SIZE,
+                    random_state=RANDOM_STATE
+                )
+            print(f"Data was split into training and test sets. (Test size: {TEST_SIZE})")
+
+            # --- MLFlow Registration Step 1: Parameters ---
+            print("Saving parameters to MLFlow...")
+            with tracer.stage("log_params"):
+                mlflow.log_param("test_size", TEST_SIZE)
+                mlflow.log_param("random_state", RANDOM_STATE)
+                mlflow.log_param("numerical_features_count", len(NUMERICAL_FEATURES))
+                mlflow.log_param("categorical_features_count", len(CATEGORICAL_FEATURES))
+                mlflow.log_param("profile_fit", profile_fit)
+
+            # 4. Create the Pipeline
+            with tracer.stage("create_pipeline"):
+                pipeline = create_pipeline()
+
+            # 5. TRAIN Pipeline
+            # The steps are fitted one by one (exactly what pipeline.fit does) so preprocessing and
+            # the forest are timed separately
+            print("Pipeline training (fit) begins...")
+            with tracer.stage("fit"), optional_cprofile(profile_fit, profile_path):
+                with tracer.stage("preprocessor"):
+                    X_train_transformed = pipeline[:-1].fit_transform(X_train, y_train)
+                with tracer.stage("classifier"):
+                    pipeline[-1].fit(X_train_transformed, y_train)
+            print("Pipeline training has been completed.")
+
+            # 6. Evaluate Pipeline
+            with tracer.stage("score"):
+                accuracy = pipeline.score(X_test, y_test)
+            print(f"The accuracy score of the model on the test data: {accuracy:.4f}")
+
+            # --- MLFlow Recording Step 2: Metrics ---
+            print("Saving metrics to MLFlow...")
+            mlflow.log_metric("accuracy", accuracy)
+
+            # 7. Save Trained Pipeline (Locally)
+            print(f"The trained model (pipeline) is saved to: {MODEL_OUTPUT_PATH}")
+
+            # Make sure the 'models/' folder exists before saving
+            MODEL_OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+            with tracer.stage("dump"):
+                dump(pipeline, MODEL_OUTPUT_PATH)
+            print("The model has been successfully saved.")
+
+            # --- MLFlow Registration Step 3: Model (Artifact) ---
+            print("Saving model (artifact) to MLFlow...")
+            with tracer.stage("log_model"):
+                mlflow.sklearn.log_model(
+                    sk_model=pipeline,
+                    artifact_path="model",
+                    input_example=X_train.head()
+                )
+
+            print("===== Training Process Completed (MLFlow) =====")
+        finally:
+            save_trace(tracer, PROFILE_OUTPUT_DIR, log_to_mlflow=True,
+                       extra_artifacts=(profile_path,) if profile_fit else ())
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train the Titanic pipeline and log the run to MLFlow.")
+    parser.add_argument("--profile-fit", action="store_true", default=PROFILE_FIT,
+                        help="Capture a cProfile profile of the pipeline fit (also: TITANIC_PROFILE_FIT=1).")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    run_training()
\ No newline at end of file
+    args = parse_args()
+    run_training(profile_fit=args.profile_fit)
\ No newline at end of file
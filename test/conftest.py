@@ -0,0 +1,61 @@
+# test/conftest.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processing import records_to_frame
+from src.pipeline import create_pipeline
+
+
+def _passengers(n: int, seed: int) -> pd.DataFrame:
+    """
+    Titanic-like raw passengers (the API's seven features), with some missing Age and Embarked values.
+
+    :param n: Number of passengers
+    :param seed: Random seed
+    :return: DataFrame in the form the API hands to the pipeline (see records_to_frame)
+    """
+    rng = np.random.default_rng(seed)
+    pclass = rng.choice([1, 2, 3], n, p=[0.24, 0.21, 0.55])
+    fare_scale = np.select([pclass == 1, pclass == 2], [85.0, 21.0], 13.0)
+    columns = {
+        "Pclass": pclass,
+        "Sex": rng.choice(["male", "female"], n, p=[0.65, 0.35]),
+        "Age": rng.uniform(0.5, 80.0, n).round(1),
+        "SibSp": rng.choice([0, 1, 2, 3, 4], n, p=[0.68, 0.23, 0.03, 0.02, 0.04]),
+        "Parch": rng.choice([0, 1, 2, 3], n, p=[0.76, 0.13, 0.09, 0.02]),
+        "Fare": rng.exponential(fare_scale).round(2),
+        "Embarked": rng.choice(["S", "C", "Q"], n, p=[0.72, 0.19, 0.09])
+    }
+    records = pd.DataFrame(columns).astype(object).to_dict("records")
+    for record, missing_age, missing_port in zip(records, rng.random(n) < 0.2, rng.random(n) < 0.01):
+        record["Age"] = None if missing_age else record["Age"]
+        record["Embarked"] = None if missing_port else record["Embarked"]
+    return records_to_frame(records)
+
+
+@pytest.fixture(scope="session")
+def make_passengers():
+    """pytest Fixture: Factory for Titanic-like raw passengers, make_passengers(n, seed) -> DataFrame."""
+    return _passengers
+
+
+@pytest.fixture(scope="session")
+def fitted_pipeline():
+    """
+    pytest Fixture: A small pipeline (see src/pipeline.py) fitted on synthetic passengers, so tests
+    need neither the Kaggle data nor a trained model file.
+
+    :return: (fitted pipeline, its training features)
+    """
+    X = _passengers(600, seed=1)
+    X = X.assign(PassengerId=np.arange(1, len(X) + 1), Name="Passenger", Ticket="0", Cabin=None)
+    rng = np.random.default_rng(1)
+    score = (X["Sex"] == "female") * 0.5 + (X["Pclass"] == 1) * 0.3 + (X["Embarked"] == "S") * 0.3
+    y = (score + rng.random(len(X)) * 0.5 > 0.6).astype(int)
+
+    pipeline = create_pipeline()
+    pipeline.set_params(classifier__n_estimators=25)
+    pipeline.fit(X, y)
+    return pipeline, X
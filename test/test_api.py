@@ -0,0 +1,34 @@
+# test/test_api.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+PASSENGER = {"Pclass": 3, "Sex": "male", "Age": None, "SibSp": 0, "Parch": 0, "Fare": 7.25, "Embarked": None}
+
+
+@pytest.fixture(scope="module")
+def client(fitted_pipeline):
+    """pytest Fixture: The API with the shared fitted pipeline (no model file, lookup table or audit log)."""
+    model, _ = fitted_pipeline
+
+    # The startup event is not run outside a 'with TestClient(...)' block, so the state is set here
+    app.state.model, app.state.lookup, app.state.audit, app.state.model_version = model, None, None, "test"
+    return TestClient(app)
+
+
+def test_batch_results_do_not_depend_on_the_rest_of_the_batch(client):
+    """
+    Test 1 (Contract Test):
+    Validates that a passenger with missing Age/Embarked gets the same result alone, in a mixed
+    batch and from '/predict' (missing values are always imputed).
+    """
+    others = [{**PASSENGER, "Age": 30.0, "Embarked": "S"}, {**PASSENGER, "Sex": "female", "Embarked": "C"}]
+
+    alone = client.post("/predict_batch", json=[PASSENGER]).json()[0]
+    mixed = client.post("/predict_batch", json=[others[0], PASSENGER, others[1]]).json()[1]
+    single = client.post("/predict", json=PASSENGER).json()
+
+    assert alone == mixed
+    assert single["Survived"] == alone["Survived"]
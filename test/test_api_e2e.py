@@ -3,10 +3,16 @@
 import pytest
 import requests
 import subprocess
-import time
 import os
 from pathlib import Path
 
+from app.loadtest import (
+    find_free_port,
+    start_uvicorn_subprocess,
+    stop_uvicorn_subprocess,
+    wait_until_ready
+)
+
 # === Test Configuration ===
 PROJECT_ROOT = Path(__file__).parent.parent
 IMAGE_NAME = "titanic-api:v3"  # The v3.0 API image for THIS project
@@ -15,19 +21,56 @@ API_URL = "http://127.0.0.1:8001"  # Use a different port (8001) to avoid confli
 HEALTH_CHECK_URL = f"{API_URL}/"
 PREDICT_URL = f"{API_URL}/predict"
 MODEL_PATH = PROJECT_ROOT / "models"
+BACKEND = os.environ.get("TITANIC_E2E_BACKEND", "docker")  # "docker" or "local"
+READINESS_TIMEOUT = 60  # Seconds to wait for the server to answer the health check
 
 
 @pytest.fixture(scope="module")
 def api_service():
     """
-    pytest Fixture: Manages the lifecycle of the v3.0 Titanic API container.
+    pytest Fixture: Manages the lifecycle of the v3.0 Titanic API.
+
+    By default the API runs in the 'titanic-api:v3' Docker container. Set
+    TITANIC_E2E_BACKEND=local to run it under a local uvicorn subprocess instead
+    (no Docker needed, only a trained model in 'models/').
 
-    1. (Setup) Starts the 'titanic-api:v3' Docker container.
-    2. Waits for the Uvicorn server to boot.
+    1. (Setup) Starts the API (Docker container or local uvicorn).
+    2. Polls the health check until the server answers (no fixed sleep).
     3. 'yield' control back to the test function.
-    4. (Teardown) Stops and removes the container.
+    4. (Teardown) Stops the container / subprocess.
     """
+    if BACKEND == "local":
+        yield from _local_api_service()
+    else:
+        yield from _docker_api_service()
+
+
+def _local_api_service():
+    """Runs the API under a local uvicorn subprocess (stand-in for the Docker container)."""
+    if not (MODEL_PATH / "titanic_model.joblib").exists():
+        pytest.skip("Local E2E backend requires a trained model. Run 'python -m src.train' first.")
+
+    port = find_free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    print(f"\n[Setup] Starting local uvicorn server on port {port}...")
+    process = start_uvicorn_subprocess(port)  # Audit log disabled: test traffic stays out of logs/audit/
+
+    try:
+        ready_after = wait_until_ready(base_url, timeout=READINESS_TIMEOUT, process=process)
+        print(f"[Setup] Health check passed after {ready_after:.2f} s. API is live.")
+    except (TimeoutError, RuntimeError) as e:
+        stop_uvicorn_subprocess(process)
+        pytest.fail(f"E2E Test Failed: {e}")
+
+    yield f"{base_url}/predict"
+
+    print("\n[Teardown] Stopping local uvicorn server...")
+    stop_uvicorn_subprocess(process)
+    print("[Teardown] Server stopped.")
 
+
+def _docker_api_service():
+    """Runs the API in the 'titanic-api:v3' Docker container."""
     # --- Setup ---
     print(f"\n[Setup] Starting v3.0 API Docker container '{IMAGE_NAME}'...")
 
@@ -49,22 +92,14 @@ def api_service():
         pytest.fail(f"Failed to start Docker container. Is the '{IMAGE_NAME}' "
                     f"image built? Is Docker running? Error: {e.stderr.decode()}")
 
-    # Wait for the Uvicorn server to boot (10 seconds)
-    time.sleep(10)
-
     # --- Health Check ---
-    retries = 5
-    for i in range(retries):
-        try:
-            response = requests.get(HEALTH_CHECK_URL, timeout=5)
-            if response.status_code == 200:
-                print("[Setup] Health check passed. API is live.")
-                break
-            time.sleep(2)
-        except requests.exceptions.ConnectionError:
-            if i == retries - 1:
-                pytest.fail("E2E Test Failed: Could not connect to the API.")
-            time.sleep(2)
+    # Poll until the Uvicorn server inside the container has booted
+    try:
+        ready_after = wait_until_ready(API_URL, timeout=READINESS_TIMEOUT)
+        print(f"[Setup] Health check passed after {ready_after:.2f} s. API is live.")
+    except TimeoutError:
+        subprocess.run(["docker", "stop", CONTAINER_NAME], capture_output=True)
+        pytest.fail("E2E Test Failed: Could not connect to the API.")
 
     yield PREDICT_URL
 
@@ -127,4 +162,27 @@ def test_api_predict_endpoint_dies(api_service):
     assert response.status_code == 200
     data = response.json()
     assert "Survived" in data
-    assert data["Survived"] == 0  # Jack should not survive (in this model)
\ No newline at end of file
+    assert data["Survived"] == 0  # Jack should not survive (in this model)
+
+@pytest.mark.slow
+def test_api_predict_batch_endpoint(api_service):
+    """
+    Test (E2E Test):
+    Sends Rose and Jack in one request to the batch endpoint and asserts
+    the same classes as the single-passenger endpoint, plus valid probabilities.
+    """
+    # Arrange: Rose and Jack (same passengers as above)
+    batch_url = api_service.replace("/predict", "/predict_batch")
+    payload = [
+        {"Pclass": 1, "Sex": "female", "Age": 19, "SibSp": 1, "Parch": 0, "Fare": 50.0, "Embarked": "C"},
+        {"Pclass": 3, "Sex": "male", "Age": 20, "SibSp": 0, "Parch": 0, "Fare": 5.0, "Embarked": "S"}
+    ]
+
+    # Act
+    response = requests.post(batch_url, json=payload)
+
+    # Assert
+    assert response.status_code == 200
+    data = response.json()
+    assert [row["Survived"] for row in data] == [1, 0]
+    assert all(0.0 <= row["SurvivalProbability"] <= 1.0 for row in data)
@@ -0,0 +1,138 @@
+# test/test_audit.py
+
+import time
+
+import pytest
+
+from app.audit import BLOCK, DROP_NEWEST, DROP_OLDEST, AuditLogger, list_segments, read_segments
+from app.audit_replay import METADATA_COLUMNS, compare, load_audit_records, rescore
+from app.loadtest import load_replay_file
+from src.data_processing import records_to_frame
+
+PASSENGER = {"Pclass": 3, "Sex": "male", "Age": 22.0, "SibSp": 1, "Parch": 0, "Fare": 7.25, "Embarked": "S"}
+
+
+def _stalled_logger(tmp_path, policy: str, max_queue: int = 3, **kwargs) -> AuditLogger:
+    """An AuditLogger whose writer never wakes up on its own, so the queue fills deterministically."""
+    return AuditLogger(tmp_path, max_queue=max_queue, batch_size=1_000, flush_interval=60,
+                       policy=policy, **kwargs)
+
+
+def test_records_are_written_to_rotated_segments(tmp_path):
+    """
+    Test 1 (Unit Test):
+    Validates that every record ends up in a closed gzip segment, rotated by record count.
+    """
+    audit = AuditLogger(tmp_path, batch_size=2, flush_interval=0.05, segment_max_records=4)
+    for i in range(10):
+        assert audit.log({**PASSENGER, "Age": float(i)}, i % 2, "v1", 0.5, endpoint="/predict")
+    audit.close()
+
+    segments = list_segments(tmp_path)
+    records = list(read_segments(segments))
+    assert len(segments) >= 3
+    assert not list(tmp_path.glob("*.part"))
+    assert [record["features"]["Age"] for record in records] == [float(i) for i in range(10)]
+    assert records[1]["prediction"] == 1 and records[1]["model_version"] == "v1"
+    assert audit.stats()["written"] == 10 and audit.stats()["dropped"] == 0
+
+    # Audit segments can be replayed by the load tester as they are
+    assert load_replay_file(segments[0])[0] == {**PASSENGER, "Age": 0.0}
+
+
+def test_full_queue_policies(tmp_path):
+    """
+    Test 2 (Unit Test):
+    Validates drop_newest, drop_oldest and block (with timeout) when the writer falls behind.
+    """
+    newest = _stalled_logger(tmp_path / "newest", DROP_NEWEST)
+    results = [newest.log({**PASSENGER, "Age": float(i)}, 0, "v1", 0.1) for i in range(5)]
+    assert results == [True, True, True, False, False]
+    assert [r["features"]["Age"] for r in newest._queue] == [0.0, 1.0, 2.0]
+
+    oldest = _stalled_logger(tmp_path / "oldest", DROP_OLDEST)
+    assert all(oldest.log({**PASSENGER, "Age": float(i)}, 0, "v1", 0.1) for i in range(5))
+    assert [r["features"]["Age"] for r in oldest._queue] == [2.0, 3.0, 4.0]
+    assert oldest.dropped == 2
+
+    # Under "block" the writer is woken up and drains the queue, so nothing is lost
+    blocking = _stalled_logger(tmp_path / "block", BLOCK, block_timeout=5.0)
+    assert all(blocking.log({**PASSENGER, "Age": float(i)}, 0, "v1", 0.1) for i in range(10))
+    for audit in (newest, oldest, blocking):
+        audit.close()
+    assert blocking.dropped == 0
+    assert len(list(read_segments(list_segments(tmp_path / "block")))) == 10
+
+    with pytest.raises(ValueError):
+        AuditLogger(tmp_path, policy="unknown")
+
+
+def test_writer_survives_write_errors(tmp_path, monkeypatch):
+    """
+    Test 3 (Unit Test):
+    Validates that a failing write is counted and dropped without killing the writer, and that
+    "block" does not wait for a writer that is no longer running.
+    """
+    audit = AuditLogger(tmp_path, batch_size=1, flush_interval=0.01)
+    open_segment = audit._open_segment
+    calls = []
+
+    def failing_open_segment():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("No space left on device")
+        open_segment()
+
+    monkeypatch.setattr(audit, "_open_segment", failing_open_segment)
+    audit.log(PASSENGER, 0, "v1", 0.1)
+    time.sleep(0.2)
+    audit.log({**PASSENGER, "Age": 1.0}, 0, "v1", 0.1)
+    audit.close()
+
+    stats = audit.stats()
+    assert stats["write_errors"] == 1 and "No space left" in stats["last_error"]
+    assert stats["dropped"] == 1 and stats["written"] == 1
+    assert [r["features"]["Age"] for r in read_segments(list_segments(tmp_path))] == [1.0]
+
+    # A dead writer: "block" gives up at once instead of waiting block_timeout per request
+    blocking = _stalled_logger(tmp_path / "dead", BLOCK, max_queue=1, block_timeout=5.0)
+    blocking._closed = True
+    blocking._wakeup.set()
+    blocking._writer.join(5)
+    blocking._closed = False
+    assert not blocking.stats()["writer_alive"]
+    start = time.perf_counter()
+    assert blocking.log(PASSENGER, 0, "v1", 0.1)
+    assert not blocking.log(PASSENGER, 0, "v1", 0.1)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_replay_reports_prediction_changes(tmp_path, fitted_pipeline, make_passengers):
+    """
+    Test 4 (Integration Test):
+    Validates that replaying the log against the logging model agrees 100%, and that flipped
+    predictions are counted.
+    """
+    model, _ = fitted_pipeline
+    new_passengers = make_passengers(50, seed=5)
+
+    audit = AuditLogger(tmp_path, flush_interval=0.05)
+    passengers = new_passengers.astype(object).where(new_passengers.notna(), None).to_dict("records")
+    passengers.append({**PASSENGER, "Embarked": None})
+    for passenger in passengers:
+        prediction = model.predict(records_to_frame([passenger]))[0]
+        audit.log(passenger, prediction, "v1", 1.0, endpoint="/predict")
+    audit.close()
+
+    records = load_audit_records(list_segments(tmp_path))
+    features = records.drop(columns=METADATA_COLUMNS)
+    new_predictions = rescore(model, features, chunk_size=16)
+    report = compare(records, new_predictions)
+    assert report["records"] == len(passengers)
+    assert report["agreement"] == 1.0
+    assert report["by_model_version"]["v1"]["records"] == len(passengers)
+
+    flipped = 1 - new_predictions
+    report = compare(records, flipped)
+    assert report["changed"] == len(passengers)
+    assert report["flipped_to_survived"] + report["flipped_to_died"] == len(passengers)
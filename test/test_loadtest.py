@@ -0,0 +1,167 @@
+# test/test_loadtest.py
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.loadtest import (
+    iter_payloads,
+    load_replay_file,
+    percentile,
+    run_load_test,
+    start_uvicorn_subprocess,
+    summarize,
+    synthetic_passenger,
+    wait_until_ready
+)
+from app.schema import Passenger
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers GET / with 200 and POST /predict (or /slow, after 50 ms) with a fixed prediction (500 for other paths)."""
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply(200, {"status": "ok"})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/predict":
+            self._reply(200, {"Survived": 1})
+        elif self.path == "/slow":
+            time.sleep(0.05)
+            self._reply(200, {"Survived": 1})
+        else:
+            self._reply(500, {"detail": "boom"})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    """pytest Fixture: A local HTTP stub that stands in for the API."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_percentile_uses_nearest_rank():
+    """
+    Test 1 (Unit Test):
+    Validates the nearest-rank percentile on a simple sorted list.
+    """
+    values = [float(v) for v in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([], 50) == 0.0
+
+
+def test_summarize_reports_error_rate_and_throughput():
+    """
+    Test 2 (Unit Test):
+    Validates the error rate, throughput and millisecond latencies of a report.
+    """
+    report = summarize([0.01, 0.02, 0.03, 0.04], {"200": 3, "500": 1}, errors=1,
+                       wall_time=2.0, passengers_per_request=10)
+
+    assert report["requests"] == 4
+    assert report["error_rate"] == 0.25
+    assert report["throughput_rps"] == 2.0
+    assert report["throughput_passengers_ps"] == 20.0
+    assert report["latency_ms"]["p50"] == pytest.approx(20.0)
+
+
+def test_synthetic_passengers_match_the_api_schema():
+    """
+    Test 3 (Contract Test):
+    Validates that every synthetic passenger is accepted by the Passenger schema.
+    """
+    rng = random.Random(0)
+    for _ in range(200):
+        Passenger(**synthetic_passenger(rng))
+
+
+def test_replay_file_is_cycled_and_batched(tmp_path):
+    """
+    Test 4 (Unit Test):
+    Validates that a JSONL replay file is loaded, cycled and grouped into batches.
+    """
+    replay_path = tmp_path / "replay.jsonl"
+    replay_path.write_text('{"Pclass": 1}\n\n{"Pclass": 3}\n')
+
+    replay = load_replay_file(replay_path)
+    bodies = list(iter_payloads(3, replay, batch_size=3))
+
+    assert len(replay) == 2
+    assert bodies[0] == [{"Pclass": 1}, {"Pclass": 3}, {"Pclass": 1}]
+    assert len(bodies) == 3
+
+
+def test_run_load_test_against_stub(stub_api):
+    """
+    Test 5 (Integration Test):
+    Drives a local stub server and validates the request and error accounting.
+    """
+    wait_until_ready(stub_api, timeout=5)
+    payloads = list(iter_payloads(40))
+
+    ok_report = run_load_test(stub_api, payloads, concurrency=4)
+    error_report = run_load_test(stub_api, payloads[:10], endpoint="/missing", concurrency=2)
+
+    assert ok_report["requests"] == 40
+    assert ok_report["errors"] == 0
+    assert ok_report["status_counts"] == {"200": 40}
+    assert error_report["error_rate"] == 1.0
+
+
+def test_open_loop_latency_includes_schedule_lag(stub_api):
+    """
+    Test 6 (Integration Test):
+    Validates that a rate the server cannot sustain shows up in the latencies and as late
+    requests, instead of silently turning into a closed-loop test (coordinated omission).
+    """
+    wait_until_ready(stub_api, timeout=5)
+    payloads = list(iter_payloads(10))
+
+    # 100 req/s against a single worker and a 50 ms endpoint: only ~20 req/s are possible
+    report = run_load_test(stub_api, payloads, endpoint="/slow", concurrency=1, rate=100)
+
+    assert report["errors"] == 0
+    assert report["late_requests"] >= 5
+    assert report["schedule_lag_ms"]["max"] > 200
+    assert report["latency_ms"]["max"] >= report["schedule_lag_ms"]["max"] + 40
+
+
+def test_harness_server_does_not_audit_by_default(tmp_path, monkeypatch):
+    """
+    Test 7 (Unit Test):
+    Validates that the harness starts its server with the audit log disabled, unless an
+    audit folder is given, so synthetic load never reaches logs/audit/.
+    """
+    environments = []
+    monkeypatch.setenv("TITANIC_AUDIT_LOG", "1")
+    monkeypatch.setattr("app.loadtest.subprocess.Popen", lambda command, cwd, env: environments.append(env))
+
+    start_uvicorn_subprocess(8001)
+    start_uvicorn_subprocess(8001, audit_dir=tmp_path)
+
+    assert environments[0]["TITANIC_AUDIT_LOG"] == "0"
+    assert environments[1]["TITANIC_AUDIT_LOG"] == "1"
+    assert environments[1]["TITANIC_AUDIT_DIR"] == str(tmp_path)
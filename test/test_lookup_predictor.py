@@ -0,0 +1,86 @@
+# test/test_lookup_predictor.py
+
+import pytest
+
+from src.data_processing import records_to_frame
+from src.lookup_predictor import LookupTablePredictor, build_lookup_predictor
+
+
+@pytest.fixture(scope="module")
+def fitted(fitted_pipeline):
+    """pytest Fixture: The shared fitted pipeline, its training features and its lookup table."""
+    pipeline, X = fitted_pipeline
+    return pipeline, X, LookupTablePredictor(pipeline, X)
+
+
+def test_batch_predictions_match_the_pipeline(fitted, make_passengers):
+    """
+    Test 1 (Parity Test):
+    Validates that the table gives exactly the pipeline's predictions on new passengers.
+    """
+    pipeline, X, lookup = fitted
+    X_new = make_passengers(3000, seed=2)
+
+    assert lookup.check_parity(X) == 0
+    assert lookup.check_parity(X_new) == 0
+
+
+def test_single_predictions_match_the_pipeline(fitted, make_passengers):
+    """
+    Test 2 (Parity Test):
+    Validates predict_one against the API's single-row path, including missing Age/Embarked.
+    """
+    pipeline, _, lookup = fitted
+    X_new = make_passengers(300, seed=3)
+    records = X_new.astype(object).where(X_new.notna(), None).to_dict("records")
+    records.append({**records[0], "Age": None, "Embarked": None})
+
+    for record in records:
+        assert lookup.predict_one(record) == pipeline.predict(records_to_frame([record]))[0]
+
+
+def test_out_of_grid_inputs_fall_back_to_the_pipeline(fitted):
+    """
+    Test 3 (Fallback Test):
+    Validates that unknown categories (and only those) are scored by the full pipeline.
+    """
+    pipeline, X, lookup = fitted
+    passenger = {**X.iloc[0].to_dict(), "Sex": "unknown", "Embarked": "S"}
+
+    assert lookup._locate(passenger)[0] is None
+    assert lookup.predict_one(passenger) == pipeline.predict(records_to_frame([passenger]))[0]
+
+
+def test_unseen_values_are_answered_by_the_table(fitted, make_passengers):
+    """
+    Test 4 (Coverage Test):
+    Validates that Age/Fare values no training passenger has, and combinations of the other
+    features that are not in the training data (built on first use), never reach the pipeline.
+    """
+    pipeline, X, lookup = fitted
+    X_new = make_passengers(1000, seed=4)
+    X_new["Fare"] += 0.01  # Between the training fares
+    X_new.loc[::10, "Parch"] = 6  # More than any training passenger
+    records = X_new.astype(object).where(X_new.notna(), None).to_dict("records")
+
+    before = lookup.stats()
+    predictions = [lookup.predict_one(record) for record in records]
+    after = lookup.stats()
+
+    assert predictions == list(pipeline.predict(records_to_frame(records)))
+    assert after["fallbacks"] == before["fallbacks"]
+    assert after["table_hits"] == before["table_hits"] + len(records)
+    assert after["slices"] > before["slices"]
+
+
+def test_oversized_grids_are_refused(fitted):
+    """
+    Test 5 (Guard Test):
+    Validates the cell limit and that build_lookup_predictor then returns None (full pipeline).
+    """
+    pipeline, X, _ = fitted
+
+    with pytest.raises(ValueError):
+        LookupTablePredictor(pipeline, X, max_cells=10)
+    assert build_lookup_predictor(pipeline, X, max_cells=10) is None
+    assert build_lookup_predictor(pipeline, X.head(50)) is not None
@@ -0,0 +1,107 @@
+# test/test_profiling.py
+
+import json
+import time
+
+import pytest
+
+from src.profiling import StageTracer, optional_cprofile, save_trace
+
+
+def test_stages_record_wall_cpu_and_nesting():
+    """
+    Test 1 (Unit Test):
+    Validates wall/CPU times, nested stage names and that failing stages are still recorded.
+    """
+    tracer = StageTracer("train")
+    with tracer.stage("fit"):
+        with tracer.stage("classifier"):
+            sum(i * i for i in range(200_000))  # CPU work
+        time.sleep(0.05)  # Wall time without CPU
+    with pytest.raises(RuntimeError):
+        with tracer.stage("log_model"):
+            raise RuntimeError("upload failed")
+
+    stages = {stage["stage"]: stage for stage in tracer.summary()}
+    assert list(stages) == ["fit", "fit.classifier", "log_model"]
+    assert stages["fit.classifier"]["depth"] == 1
+    assert stages["fit"]["wall_s"] >= stages["fit.classifier"]["wall_s"] + 0.05
+    assert stages["fit.classifier"]["cpu_s"] > 0
+    assert stages["fit"]["wall_s"] - stages["fit"]["cpu_s"] >= 0.04
+    assert stages["fit"]["status"] == "ok" and stages["log_model"]["status"] == "error"
+
+
+def test_trace_file_is_a_chrome_trace(tmp_path):
+    """
+    Test 2 (Unit Test):
+    Validates the machine-readable trace file (Chrome Trace Event format).
+    """
+    tracer = StageTracer("predict")
+    with tracer.stage("load_data"):
+        pass
+    with tracer.stage("predict"):
+        pass
+
+    path = tracer.write(tmp_path)
+    trace = json.loads(path.read_text(encoding="utf-8"))
+    events = trace["traceEvents"]
+    assert path.name.startswith("predict_") and path.name.endswith(".trace.json")
+    assert [event["name"] for event in events] == ["load_data", "predict"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    assert events[1]["ts"] >= events[0]["ts"] + events[0]["dur"]
+    assert {"cpu_s", "peak_rss_delta_mb", "status"} <= set(events[0]["args"])
+
+
+def test_optional_cprofile_only_profiles_when_enabled(tmp_path):
+    """
+    Test 3 (Unit Test):
+    Validates that the opt-in fit profile is saved only when enabled.
+    """
+    with optional_cprofile(False, tmp_path / "off.prof"):
+        sorted(range(1000))
+    with optional_cprofile(True, tmp_path / "on.prof", top=5):
+        sorted(range(1000))
+
+    assert not (tmp_path / "off.prof").exists()
+    assert (tmp_path / "on.prof").stat().st_size > 0
+
+
+def test_trace_is_saved_when_a_run_fails(tmp_path):
+    """
+    Test 4 (Unit Test):
+    Validates that save_trace in a 'finally' block keeps the trace of a run that stopped early.
+    """
+    tracer = StageTracer("train")
+    with pytest.raises(SystemExit):
+        try:
+            with tracer.stage("load_data"):
+                pass
+            with tracer.stage("log_model"):
+                raise SystemExit(1)
+        finally:
+            path = save_trace(tracer, tmp_path)
+
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    assert [(event["name"], event["args"]["status"]) for event in events] == [("load_data", "ok"), ("log_model", "error")]
+
+    # Saving never raises (it runs in 'finally' and must not hide the original error)
+    assert save_trace(tracer, path / "not-a-directory") is None
+
+
+def test_trace_is_saved_when_mlflow_is_unreachable(tmp_path, monkeypatch):
+    """
+    Test 5 (Unit Test):
+    Validates that a training run that fails before its MLFlow run starts still saves its trace.
+    """
+    import src.train as train
+
+    def unreachable(name):
+        raise ConnectionError("tracking server is down")
+
+    monkeypatch.setattr(train, "PROFILE_OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(train.mlflow, "set_experiment", unreachable)
+    with pytest.raises(ConnectionError):
+        train.run_training()
+
+    events = json.loads(next(tmp_path.glob("train_*.trace.json")).read_text(encoding="utf-8"))["traceEvents"]
+    assert [(event["name"], event["args"]["status"]) for event in events] == [("set_experiment", "error")]